@@ -1,8 +1,92 @@
-import json
 import os
-import hashlib
-import psycopg2
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
+
+from passwords import hash_password, verify_password
+from runtime import HttpError, Reply, Request, Router
+from tokens import issue_token
+
+# Public user ids ('#1001', ...) that get the admin claim in their session token
+ADMIN_USER_IDS = set(filter(None, os.environ.get('ADMIN_USER_IDS', '#1001').split(',')))
+
+app = Router(cors_headers=('Content-Type',), auth=False)
+
+
+def session_payload(user: tuple) -> Dict[str, Any]:
+    '''User fields for the client plus a signed session token when a signing key is configured'''
+    payload = {
+        'id': user[0],
+        'user_id': user[1],
+        'email': user[2],
+        'is_creator': user[3]
+    }
+    issued = issue_token({
+        'sub': user[0],
+        'uid': user[1],
+        'creator': bool(user[3]),
+        'admin': user[1] in ADMIN_USER_IDS
+    })
+    if issued:
+        payload['token'], payload['token_expires_at'] = issued
+    return payload
+
+
+def credentials(req: Request) -> Tuple[str, str]:
+    email = req.body.get('email')
+    password = req.body.get('password')
+    if not isinstance(email, str) or not email or not isinstance(password, str) or not password:
+        raise HttpError(400, 'email and password required')
+    return email, password
+
+
+@app.route('POST', 'register')
+def register(req: Request) -> Any:
+    email, password = credentials(req)
+    password_hash = hash_password(password)
+
+    # user_id defaults to the next '#<number>' from users_public_number_seq;
+    # the very first account becomes the creator
+    req.cursor.execute(
+        """
+        INSERT INTO users (email, password_hash, is_creator)
+        VALUES (%s, %s, NOT EXISTS (SELECT 1 FROM users))
+        ON CONFLICT (email) DO NOTHING
+        RETURNING id, user_id, email, is_creator
+        """,
+        (email, password_hash)
+    )
+    user = req.cursor.fetchone()
+    req.conn.commit()
+
+    if not user:
+        return Reply(409, {'error': 'Email already registered'})
+
+    return session_payload(user)
+
+
+@app.route('POST', 'login')
+def login(req: Request) -> Any:
+    email, password = credentials(req)
+
+    req.cursor.execute(
+        "SELECT id, user_id, email, is_creator, password_hash FROM users WHERE email = %s",
+        (email,)
+    )
+    user = req.cursor.fetchone()
+
+    ok, needs_rehash = verify_password(password, user[4] if user else None)
+    if not ok:
+        return Reply(401, {'error': 'Invalid credentials'})
+
+    if needs_rehash:
+        # Upgrade legacy sha256 or outdated scrypt cost; only if the hash is unchanged
+        req.cursor.execute(
+            "UPDATE users SET password_hash = %s WHERE id = %s AND password_hash = %s",
+            (hash_password(password), user[0], user[4])
+        )
+        req.conn.commit()
+
+    return session_payload(user)
+
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
@@ -10,98 +94,4 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     Args: event with httpMethod, body
     Returns: HTTP response with user data or error
     '''
-    method: str = event.get('httpMethod', 'GET')
-    
-    if method == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type',
-                'Access-Control-Max-Age': '86400'
-            },
-            'body': ''
-        }
-    
-    if method != 'POST':
-        return {
-            'statusCode': 405,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Method not allowed'}),
-            'isBase64Encoded': False
-        }
-    
-    body_data = json.loads(event.get('body', '{}'))
-    action = body_data.get('action')
-    
-    dsn = os.environ.get('DATABASE_URL')
-    conn = psycopg2.connect(dsn)
-    cur = conn.cursor()
-    
-    try:
-        if action == 'register':
-            email = body_data.get('email')
-            password = body_data.get('password')
-            
-            cur.execute("SELECT COUNT(*) FROM users")
-            user_count = cur.fetchone()[0]
-            user_id = f"#{1000 + user_count}"
-            
-            password_hash = hashlib.sha256(password.encode()).hexdigest()
-            
-            is_creator = user_count == 0
-            
-            cur.execute(
-                "INSERT INTO users (user_id, email, password_hash, is_creator) VALUES (%s, %s, %s, %s) RETURNING id, user_id, email, is_creator",
-                (user_id, email, password_hash, is_creator)
-            )
-            user = cur.fetchone()
-            conn.commit()
-            
-            return {
-                'statusCode': 200,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({
-                    'id': user[0],
-                    'user_id': user[1],
-                    'email': user[2],
-                    'is_creator': user[3]
-                }),
-                'isBase64Encoded': False
-            }
-        
-        elif action == 'login':
-            email = body_data.get('email')
-            password = body_data.get('password')
-            password_hash = hashlib.sha256(password.encode()).hexdigest()
-            
-            cur.execute(
-                "SELECT id, user_id, email, is_creator FROM users WHERE email = %s AND password_hash = %s",
-                (email, password_hash)
-            )
-            user = cur.fetchone()
-            
-            if not user:
-                return {
-                    'statusCode': 401,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Invalid credentials'}),
-                    'isBase64Encoded': False
-                }
-            
-            return {
-                'statusCode': 200,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({
-                    'id': user[0],
-                    'user_id': user[1],
-                    'email': user[2],
-                    'is_creator': user[3]
-                }),
-                'isBase64Encoded': False
-            }
-    
-    finally:
-        cur.close()
-        conn.close()
+    return app(event, context)
@@ -0,0 +1,243 @@
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+FUNCTION_NAME = os.environ.get('FUNCTION_NAME') or os.path.basename(os.path.dirname(os.path.abspath(__file__)))
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '200'))
+EXPLAIN_SAMPLE_RATE = float(os.environ.get('EXPLAIN_SAMPLE_RATE', '0.1'))
+EXPLAIN_COOLDOWN_SECONDS = float(os.environ.get('EXPLAIN_COOLDOWN_SECONDS', '300'))
+# summary - one line per invocation plus slow statements, slow - slow statements only, off
+INVOCATION_LOG = os.environ.get('INVOCATION_LOG', 'summary')
+
+# Only plannable statements can be explained; LISTEN and friends cannot
+EXPLAINABLE = re.compile(r'^\s*(SELECT|WITH|INSERT|UPDATE|DELETE)\b', re.IGNORECASE)
+
+
+def fingerprint(sql: str) -> str:
+    return hashlib.sha1(' '.join(sql.split()).encode()).hexdigest()[:12]
+
+
+def emit(record: Dict[str, Any]) -> None:
+    '''One JSON line on stderr, which the platform collects with the function logs'''
+    sys.stderr.write(json.dumps(record, default=str, separators=(',', ':')) + '\n')
+
+
+class Registry:
+    '''
+    Business: Aggregate counters of this container since it started
+    Args: fed by Trace.finish() at the end of every invocation
+    Returns: snapshot() as a dict, prometheus() in the text exposition format
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.invocations: Dict[int, int] = {}
+        self.totals: Dict[str, float] = {
+            'invocation_seconds': 0.0,
+            'checkout_seconds': 0.0,
+            'connect_seconds': 0.0,
+            'connects': 0,
+            'commit_seconds': 0.0,
+            'commits': 0,
+            'slow_statements': 0,
+            'explains': 0
+        }
+        self.statements: Dict[str, Dict[str, Any]] = {}
+        self._explained_at: Dict[str, float] = {}
+
+    def should_explain(self, key: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._explained_at.get(key, float('-inf')) < EXPLAIN_COOLDOWN_SECONDS:
+                return False
+            if random.random() >= EXPLAIN_SAMPLE_RATE:
+                return False
+            self._explained_at[key] = now
+            return True
+
+    def add(self, trace: 'Trace', status: int) -> None:
+        with self._lock:
+            self.invocations[status] = self.invocations.get(status, 0) + 1
+            self.totals['invocation_seconds'] += trace.elapsed
+            self.totals['checkout_seconds'] += trace.checkout_seconds
+            self.totals['connect_seconds'] += trace.connect_seconds
+            self.totals['connects'] += 1 if trace.connect_seconds else 0
+            self.totals['commit_seconds'] += trace.commit_seconds
+            self.totals['commits'] += trace.commits
+            self.totals['slow_statements'] += sum(1 for s in trace.statements if s['slow'])
+            self.totals['explains'] += trace.explains
+            for s in trace.statements:
+                entry = self.statements.setdefault(s['id'], {
+                    'sql': s['sql'], 'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'rows': 0, 'errors': 0
+                })
+                entry['calls'] += 1
+                entry['seconds'] += s['ms'] / 1000
+                entry['max_seconds'] = max(entry['max_seconds'], s['ms'] / 1000)
+                entry['rows'] += max(s['rows'], 0)
+                entry['errors'] += 1 if s.get('error') else 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'function': FUNCTION_NAME,
+                'uptime_seconds': round(time.time() - self.started, 1),
+                'invocations': {str(k): v for k, v in self.invocations.items()},
+                'totals': dict(self.totals),
+                'statements': {k: dict(v) for k, v in self.statements.items()}
+            }
+
+    def prometheus(self) -> str:
+        data = self.snapshot()
+        fn = f'function="{FUNCTION_NAME}"'
+        lines = []
+        for status, count in sorted(data['invocations'].items()):
+            lines.append(f'invocations_total{{{fn},status="{status}"}} {count}')
+        for name, value in sorted(data['totals'].items()):
+            prefix = '' if name.startswith('invocation') else 'db_'
+            lines.append(f'{prefix}{name}_total{{{fn}}} {value}')
+        for key, s in sorted(data['statements'].items()):
+            labels = f'{fn},statement="{key}"'
+            lines.append(f'db_statement_calls_total{{{labels}}} {s["calls"]}')
+            lines.append(f'db_statement_seconds_total{{{labels}}} {s["seconds"]:.6f}')
+            lines.append(f'db_statement_max_seconds{{{labels}}} {s["max_seconds"]:.6f}')
+            lines.append(f'db_statement_rows_total{{{labels}}} {s["rows"]}')
+            lines.append(f'db_statement_errors_total{{{labels}}} {s["errors"]}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class Trace:
+    '''Timings of one invocation: checkout, connect, statements, commits'''
+
+    def __init__(self, method: str, action: Optional[str]):
+        self.method = method
+        self.action = action
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self.checkout_seconds = 0.0
+        self.connect_seconds = 0.0
+        self.commit_seconds = 0.0
+        self.commits = 0
+        self.explains = 0
+        self.statements: List[Dict[str, Any]] = []
+
+    def statement(self, sql: str, seconds: float, rows: int, error: Optional[str] = None) -> Dict[str, Any]:
+        record = {
+            'id': fingerprint(sql),
+            'sql': ' '.join(sql.split())[:200],
+            'ms': round(seconds * 1000, 3),
+            'rows': rows,
+            'slow': seconds * 1000 >= SLOW_QUERY_MS
+        }
+        if error:
+            record['error'] = error
+        self.statements.append(record)
+        return record
+
+    def finish(self, status: int) -> None:
+        self.elapsed = time.perf_counter() - self.started
+        REGISTRY.add(self, status)
+        if INVOCATION_LOG == 'summary':
+            emit({
+                'type': 'invocation',
+                'function': FUNCTION_NAME,
+                'method': self.method,
+                'action': self.action,
+                'status': status,
+                'ms': round(self.elapsed * 1000, 3),
+                'checkout_ms': round(self.checkout_seconds * 1000, 3),
+                'connect_ms': round(self.connect_seconds * 1000, 3),
+                'commit_ms': round(self.commit_seconds * 1000, 3),
+                'db_ms': round(sum(s['ms'] for s in self.statements), 3),
+                'statements': [{k: s[k] for k in ('id', 'ms', 'rows')} for s in self.statements]
+            })
+
+
+class InstrumentedCursor:
+    '''psycopg2 cursor that times every execute into the invocation's Trace'''
+
+    def __init__(self, cursor: Any, conn: 'InstrumentedConnection'):
+        self._cursor = cursor
+        self._conn = conn
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self) -> 'InstrumentedCursor':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._cursor.close()
+
+    def execute(self, query: Any, params: Any = None) -> None:
+        sql = query if isinstance(query, str) else query.as_string(self._cursor.connection)
+        started = time.perf_counter()
+        try:
+            self._cursor.execute(query, params)
+        except Exception as e:
+            self._conn.trace.statement(sql, time.perf_counter() - started, -1, type(e).__name__)
+            raise
+        record = self._conn.trace.statement(sql, time.perf_counter() - started, self._cursor.rowcount)
+        if record['slow']:
+            self._slow(sql, params, record)
+
+    def _slow(self, sql: str, params: Any, record: Dict[str, Any]) -> None:
+        plan = None
+        if EXPLAINABLE.match(sql) and REGISTRY.should_explain(record['id']):
+            plan = self._explain(sql, params)
+        if INVOCATION_LOG != 'off':
+            emit(dict(record, type='slow_statement', function=FUNCTION_NAME, sql=' '.join(sql.split()), plan=plan))
+
+    def _explain(self, sql: str, params: Any) -> Any:
+        # EXPLAIN without ANALYZE plans but does not run the statement; a savepoint
+        # keeps a failing EXPLAIN from aborting the caller's transaction
+        raw = self._conn.raw
+        in_transaction = not raw.autocommit
+        with raw.cursor() as cur:
+            try:
+                if in_transaction:
+                    cur.execute('SAVEPOINT instrument_explain')
+                cur.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+                plan = cur.fetchone()[0]
+                if in_transaction:
+                    cur.execute('RELEASE SAVEPOINT instrument_explain')
+                self._conn.trace.explains += 1
+                return plan
+            except Exception as e:
+                if in_transaction:
+                    cur.execute('ROLLBACK TO SAVEPOINT instrument_explain')
+                return {'error': str(e)}
+
+
+class InstrumentedConnection:
+    '''Pooled connection as handed to a route: cursors and commits are traced'''
+
+    def __init__(self, conn: Any, trace: Trace):
+        self.raw = conn
+        self.trace = trace
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.raw, name)
+
+    def cursor(self, *args: Any, **kwargs: Any) -> InstrumentedCursor:
+        return InstrumentedCursor(self.raw.cursor(*args, **kwargs), self)
+
+    def commit(self) -> None:
+        started = time.perf_counter()
+        try:
+            self.raw.commit()
+        finally:
+            self.trace.commit_seconds += time.perf_counter() - started
+            self.trace.commits += 1
@@ -0,0 +1,180 @@
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+SCRYPT_N = int(os.environ.get('PASSWORD_SCRYPT_N', str(2 ** 14)))
+SCRYPT_R = int(os.environ.get('PASSWORD_SCRYPT_R', '8'))
+SCRYPT_P = int(os.environ.get('PASSWORD_SCRYPT_P', '1'))
+KDF_WORKERS = int(os.environ.get('PASSWORD_KDF_WORKERS', '2'))
+KDF_TIMEOUT = float(os.environ.get('PASSWORD_KDF_TIMEOUT', '10'))
+VERIFY_CACHE_SECONDS = float(os.environ.get('PASSWORD_VERIFY_CACHE_SECONDS', '60'))
+VERIFY_CACHE_SIZE = int(os.environ.get('PASSWORD_VERIFY_CACHE_SIZE', '1024'))
+
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+
+class PasswordVerifier(ABC):
+    '''
+    Business: One password hashing scheme that stored hashes can be checked against
+    Args: scheme - prefix of stored hashes this verifier owns
+    Returns: verification results
+    '''
+    scheme = ''
+
+    @abstractmethod
+    def verify(self, password: str, encoded: str) -> bool:
+        pass
+
+    def needs_rehash(self, encoded: str) -> bool:
+        return True
+
+
+class PasswordHasher(PasswordVerifier):
+    '''A scheme new hashes are written with'''
+
+    @abstractmethod
+    def hash(self, password: str) -> str:
+        pass
+
+
+class LegacySha256Hasher(PasswordVerifier):
+    '''Unsalted hex sha256 written by the first auth version, verify only'''
+    scheme = 'sha256'
+
+    def verify(self, password: str, encoded: str) -> bool:
+        return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), encoded)
+
+
+class ScryptHasher(PasswordHasher):
+    '''Salted scrypt stored as scrypt$n$r$p$salt$key'''
+    scheme = 'scrypt'
+
+    def __init__(self, n: int = SCRYPT_N, r: int = SCRYPT_R, p: int = SCRYPT_P):
+        self.n, self.r, self.p = n, r, p
+
+    @staticmethod
+    def _derive(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+        # maxmem must cover 128 * n * r bytes plus some slack
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                              maxmem=256 * n * r + 1024 * 1024, dklen=KEY_BYTES)
+
+    @staticmethod
+    def _decode(encoded: str) -> Tuple[int, int, int, bytes, bytes]:
+        _, n, r, p, salt, key = encoded.split('$')
+        return int(n), int(r), int(p), base64.b64decode(salt), base64.b64decode(key)
+
+    def hash(self, password: str) -> str:
+        salt = os.urandom(SALT_BYTES)
+        key = self._derive(password, salt, self.n, self.r, self.p)
+        return '$'.join([
+            self.scheme, str(self.n), str(self.r), str(self.p),
+            base64.b64encode(salt).decode(), base64.b64encode(key).decode()
+        ])
+
+    def verify(self, password: str, encoded: str) -> bool:
+        try:
+            n, r, p, salt, key = self._decode(encoded)
+        except ValueError:
+            return False
+        return hmac.compare_digest(self._derive(password, salt, n, r, p), key)
+
+    def needs_rehash(self, encoded: str) -> bool:
+        try:
+            n, r, p, _, _ = self._decode(encoded)
+        except ValueError:
+            return True
+        return (n, r, p) != (self.n, self.r, self.p)
+
+
+CURRENT = ScryptHasher()
+HASHERS: Dict[str, PasswordVerifier] = {CURRENT.scheme: CURRENT, 'sha256': LegacySha256Hasher()}
+
+# Bounds how many memory-hard derivations run at once in this container
+_kdf_pool = ThreadPoolExecutor(max_workers=KDF_WORKERS, thread_name_prefix='kdf')
+
+# Verified against when the email is unknown so both paths cost the same
+_DUMMY_HASH = CURRENT.hash('dummy password')
+
+
+def _hasher_for(encoded: str) -> PasswordVerifier:
+    scheme = encoded.split('$', 1)[0] if '$' in encoded else 'sha256'
+    return HASHERS.get(scheme, HASHERS['sha256'])
+
+
+class VerificationCache:
+    '''
+    Business: Remembers recent successful verifications so repeated logins skip the KDF
+    Args: ttl seconds (0 disables), max entries
+    Returns: whether a (password, stored hash) pair was verified recently
+
+    Entries are HMACs under a per-process random key, so neither passwords nor
+    anything usable outside this process is kept. A changed password changes the
+    stored hash and therefore misses.
+    '''
+
+    def __init__(self, ttl: float = VERIFY_CACHE_SECONDS, max_entries: int = VERIFY_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._key = os.urandom(32)
+        self._entries: 'OrderedDict[bytes, float]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _fingerprint(self, password: str, encoded: str) -> bytes:
+        return hmac.new(self._key, f'{encoded}\0{password}'.encode(), hashlib.sha256).digest()
+
+    def contains(self, password: str, encoded: str) -> bool:
+        if self.ttl <= 0:
+            return False
+        fingerprint = self._fingerprint(password, encoded)
+        with self._lock:
+            expires_at = self._entries.get(fingerprint)
+            if expires_at is None:
+                return False
+            if expires_at <= time.monotonic():
+                del self._entries[fingerprint]
+                return False
+            return True
+
+    def add(self, password: str, encoded: str) -> None:
+        if self.ttl <= 0:
+            return
+        fingerprint = self._fingerprint(password, encoded)
+        with self._lock:
+            self._entries[fingerprint] = time.monotonic() + self.ttl
+            self._entries.move_to_end(fingerprint)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_verified = VerificationCache()
+
+
+def hash_password(password: str) -> str:
+    return _kdf_pool.submit(CURRENT.hash, password).result(timeout=KDF_TIMEOUT)
+
+
+def verify_password(password: str, encoded: Optional[str]) -> Tuple[bool, bool]:
+    '''
+    Business: Check a password against a stored hash of any known scheme
+    Args: plain password, stored hash or None when no such user exists
+    Returns: (matches, needs_rehash) - rehash when the scheme or cost is outdated
+    '''
+    if encoded is None:
+        _kdf_pool.submit(CURRENT.verify, password, _DUMMY_HASH).result(timeout=KDF_TIMEOUT)
+        return False, False
+    hasher = _hasher_for(encoded)
+    needs_rehash = hasher is not CURRENT or CURRENT.needs_rehash(encoded)
+    if _verified.contains(password, encoded):
+        return True, needs_rehash
+    ok = _kdf_pool.submit(hasher.verify, password, encoded).result(timeout=KDF_TIMEOUT)
+    if ok:
+        _verified.add(password, encoded)
+    return ok, ok and needs_rehash
@@ -0,0 +1,162 @@
+import os
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+import psycopg2
+import psycopg2.extensions
+
+POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', '4'))
+HEALTH_CHECK_AFTER = float(os.environ.get('DB_POOL_HEALTH_CHECK_AFTER', '30'))
+CHECKOUT_TIMEOUT = float(os.environ.get('DB_POOL_CHECKOUT_TIMEOUT', '10'))
+
+
+class PoolExhausted(Exception):
+    pass
+
+
+class ConnectionPool:
+    '''
+    Business: Keeps Postgres connections open between invocations of a warm container
+    Args: dsn, max_size - upper bound of connections, health_check_after - idle seconds before ping
+    Returns: connections via checkout(), taken back via release()
+    '''
+
+    def __init__(self, dsn: str, max_size: int = POOL_MAX_SIZE, health_check_after: float = HEALTH_CHECK_AFTER):
+        self.dsn = dsn
+        self.max_size = max_size
+        self.health_check_after = health_check_after
+        self._idle: List[Tuple[Any, float]] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._stats: Dict[str, Any] = {
+            'checkouts': 0,
+            'hits': 0,
+            'misses': 0,
+            'reconnects': 0,
+            'discarded': 0,
+            'wait_seconds_total': 0.0,
+            'wait_seconds_max': 0.0,
+            'connect_seconds_total': 0.0,
+        }
+        self._local = threading.local()
+
+    def checkout(self, timeout: float = CHECKOUT_TIMEOUT) -> Any:
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=timeout):
+            raise PoolExhausted(f'No free database connection after {timeout}s')
+        waited = time.monotonic() - started
+
+        try:
+            conn = self._take_idle()
+            with self._lock:
+                self._stats['checkouts'] += 1
+                self._stats['wait_seconds_total'] += waited
+                self._stats['wait_seconds_max'] = max(self._stats['wait_seconds_max'], waited)
+                self._stats['hits' if conn is not None else 'misses'] += 1
+            self._local.connect_seconds = 0.0
+            if conn is None:
+                connect_started = time.monotonic()
+                conn = psycopg2.connect(self.dsn)
+                self._local.connect_seconds = time.monotonic() - connect_started
+                with self._lock:
+                    self._stats['connect_seconds_total'] += self._local.connect_seconds
+            return conn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn: Any) -> None:
+        try:
+            if self._reset(conn):
+                with self._lock:
+                    self._idle.append((conn, time.monotonic()))
+            else:
+                self._discard(conn)
+        finally:
+            self._slots.release()
+
+    def last_connect_seconds(self) -> float:
+        '''Time the calling thread's latest checkout spent opening a new connection, 0 on a pool hit'''
+        return getattr(self._local, 'connect_seconds', 0.0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            data = dict(self._stats)
+            data['idle'] = len(self._idle)
+        data['max_size'] = self.max_size
+        return data
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def _take_idle(self) -> Any:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                conn, idle_since = self._idle.pop()
+            if self._is_healthy(conn, idle_since):
+                return conn
+            self._discard(conn)
+            with self._lock:
+                self._stats['reconnects'] += 1
+
+    def _is_healthy(self, conn: Any, idle_since: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < self.health_check_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _reset(self, conn: Any) -> bool:
+        if conn.closed:
+            return False
+        try:
+            if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            return conn.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn: Any) -> None:
+        with self._lock:
+            self._stats['discarded'] += 1
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(os.environ.get('DATABASE_URL'))
+    return _pool
+
+
+def checkout() -> Any:
+    return get_pool().checkout()
+
+
+def release(conn: Any) -> None:
+    get_pool().release(conn)
+
+
+def pool_stats() -> Dict[str, Any]:
+    return get_pool().stats()
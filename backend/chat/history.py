@@ -0,0 +1,63 @@
+from typing import Any, Dict, Optional, Tuple
+
+from runtime import InvalidInput
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Sender data is loaded once per page with projection.select_users
+MESSAGE_COLUMNS = 'm.id, m.sender_id, m.message_text AS text, m.created_at'
+
+
+class InvalidPage(InvalidInput):
+    pass
+
+
+def _optional_int(params: Dict[str, Any], name: str) -> Optional[int]:
+    raw = params.get(name)
+    if raw in (None, ''):
+        return None
+    try:
+        value = int(raw)
+    except (TypeError, ValueError):
+        raise InvalidPage(f'{name} must be an integer')
+    if value < 0:
+        raise InvalidPage(f'{name} must not be negative')
+    return value
+
+
+def parse_page(params: Dict[str, Any]) -> Tuple[Optional[int], Optional[int], int]:
+    '''
+    Business: Read before_id/since_id/limit of a chat history request
+    Args: queryStringParameters
+    Returns: before_id, since_id and a clamped page size
+    '''
+    before_id = _optional_int(params, 'before_id')
+    since_id = _optional_int(params, 'since_id')
+    if before_id is not None and since_id is not None:
+        raise InvalidPage('Use either before_id or since_id')
+    limit = _optional_int(params, 'limit') or DEFAULT_PAGE_SIZE
+    return before_id, since_id, min(limit, MAX_PAGE_SIZE)
+
+
+def build_history_query(chat_id: Any, before_id: Optional[int], since_id: Optional[int], limit: int) -> Tuple[str, tuple]:
+    '''
+    Business: Keyset query over idx_messages_chat_id_id
+    Args: chat id, one of before_id (older page) / since_id (new messages) or neither (latest page), page size
+    Returns: SQL and params fetching limit + 1 rows; rows come newest first unless since_id is set
+    '''
+    if since_id is not None:
+        where, order, params = 'm.chat_id = %s AND m.id > %s', 'ASC', (chat_id, since_id)
+    elif before_id is not None:
+        where, order, params = 'm.chat_id = %s AND m.id < %s', 'DESC', (chat_id, before_id)
+    else:
+        where, order, params = 'm.chat_id = %s', 'DESC', (chat_id,)
+
+    sql = f"""
+        SELECT {MESSAGE_COLUMNS}
+        FROM messages m
+        WHERE {where}
+        ORDER BY m.id {order}
+        LIMIT %s
+    """
+    return sql, params + (limit + 1,)
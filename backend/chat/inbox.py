@@ -0,0 +1,79 @@
+# chat_inbox holds one row per chat participant so the chat list is a single
+# index scan on (user_id, last_message_at). send_message keeps it current in
+# the same statement that stores the message and wakes long-polling readers
+# through NOTIFY on the chat_<id> channel once it commits.
+
+LIST_INBOX_SQL = """
+    SELECT i.chat_id, u.id AS friend_id, u.user_id AS friend_user_id,
+           u.email AS friend_email, u.avatar_url AS friend_avatar,
+           i.last_message_text AS last_message, i.last_message_at AS last_message_time,
+           i.unread_count
+    FROM chat_inbox i
+    JOIN users u ON u.id = i.peer_id
+    WHERE i.user_id = %s
+    ORDER BY i.last_message_at DESC NULLS LAST, i.chat_id DESC
+"""
+
+# Direct chats are keyed by (user_low, user_high), so finding or creating one is
+# a single upsert. The no-op DO UPDATE makes RETURNING yield the existing chat;
+# participants and inbox rows are only written when the chat is new.
+CREATE_DIRECT_CHAT_SQL = """
+    WITH chat AS (
+        INSERT INTO chats (user_low, user_high)
+        VALUES (LEAST(%(user_id)s, %(friend_id)s), GREATEST(%(user_id)s, %(friend_id)s))
+        ON CONFLICT (user_low, user_high) DO UPDATE SET user_low = EXCLUDED.user_low
+        RETURNING id, xmax = 0 AS created
+    ), participants AS (
+        INSERT INTO chat_participants (chat_id, user_id)
+        SELECT chat.id, member.user_id
+        FROM chat, (VALUES (%(user_id)s), (%(friend_id)s)) AS member(user_id)
+        WHERE chat.created
+        ON CONFLICT (chat_id, user_id) DO NOTHING
+    ), inbox AS (
+        INSERT INTO chat_inbox (user_id, chat_id, peer_id)
+        SELECT member.user_id, chat.id, member.peer_id
+        FROM chat, (VALUES (%(user_id)s, %(friend_id)s), (%(friend_id)s, %(user_id)s)) AS member(user_id, peer_id)
+        WHERE chat.created
+        ON CONFLICT (user_id, chat_id) DO NOTHING
+    )
+    SELECT id, created FROM chat
+"""
+
+# A message committed out of order never replaces a newer last message, but it
+# still counts as unread for everyone except its sender. Nothing is stored when
+# the sender is not a participant of the chat.
+SEND_MESSAGE_SQL = """
+    WITH message AS (
+        INSERT INTO messages (chat_id, sender_id, message_text)
+        SELECT p.chat_id, p.user_id, %(message_text)s
+        FROM chat_participants p
+        WHERE p.chat_id = %(chat_id)s AND p.user_id = %(sender_id)s
+        RETURNING id, chat_id, sender_id, message_text, created_at
+    ), inbox AS (
+        UPDATE chat_inbox i
+        SET last_message_id = CASE WHEN i.last_message_id IS NULL OR m.id > i.last_message_id
+                                   THEN m.id ELSE i.last_message_id END,
+            last_message_text = CASE WHEN i.last_message_id IS NULL OR m.id > i.last_message_id
+                                     THEN m.message_text ELSE i.last_message_text END,
+            last_message_at = CASE WHEN i.last_message_id IS NULL OR m.id > i.last_message_id
+                                   THEN m.created_at ELSE i.last_message_at END,
+            unread_count = CASE WHEN i.user_id = m.sender_id THEN 0 ELSE i.unread_count + 1 END
+        FROM message m
+        WHERE i.chat_id = m.chat_id
+    )
+    SELECT id, created_at, pg_notify('chat_' || chat_id, id::text) FROM message
+"""
+
+# chat_participants has a row for every member of direct and legacy chats alike;
+# no row means the chat does not exist, false that the user is not in it.
+CHAT_MEMBER_SQL = """
+    SELECT EXISTS (SELECT 1 FROM chat_participants p WHERE p.chat_id = c.id AND p.user_id = %(user_id)s)
+    FROM chats c
+    WHERE c.id = %(chat_id)s
+"""
+
+MARK_READ_SQL = """
+    UPDATE chat_inbox SET unread_count = 0
+    WHERE user_id = %s AND chat_id = %s
+    RETURNING unread_count
+"""
@@ -1,161 +1,141 @@
-import json
-import os
-import psycopg2
 from typing import Dict, Any
 
+from history import InvalidPage, build_history_query, parse_page
+from inbox import CHAT_MEMBER_SQL, CREATE_DIRECT_CHAT_SQL, LIST_INBOX_SQL, MARK_READ_SQL, SEND_MESSAGE_SQL
+from longpoll import parse_wait, wait_for_messages
+from projection import parse_projection, select_users, sideload
+from response import fetch_dicts
+from runtime import HttpError, Request, Router, one
+
+# Sender fields of a full message row and their historical response keys
+SENDER_FIELDS = ('email', 'avatar_url')
+SENDER_KEYS = {'email': 'sender_email', 'avatar_url': 'sender_avatar'}
+
+app = Router()
+
+
+def require_int(value: Any, name: str) -> int:
+    if isinstance(value, str) and value.isdigit():
+        value = int(value)
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise HttpError(400, f'{name} must be an integer')
+    return value
+
+
+def require_member(cur: Any, chat_id: int, user_id: int) -> None:
+    cur.execute(CHAT_MEMBER_SQL, {'chat_id': chat_id, 'user_id': user_id})
+    if not one(cur, 'Chat not found')[0]:
+        raise HttpError(403, 'Not a member of this chat')
+
+
+@app.route('GET', 'chats')
+def list_chats(req: Request) -> Any:
+    user_id = require_int(req.acting_user(req.params.get('user_id')), 'user_id')
+
+    req.cursor.execute(LIST_INBOX_SQL, (user_id,))
+
+    return {'chats': fetch_dicts(req.cursor)}
+
+
+@app.route('GET', 'messages')
+def list_messages(req: Request) -> Any:
+    params = req.params
+    chat_id = require_int(params.get('chat_id'), 'chat_id')
+    before_id, since_id, limit = parse_page(params)
+    view, fields = parse_projection(params, SENDER_FIELDS)
+    wait = parse_wait(params)
+    if wait and since_id is None:
+        raise InvalidPage('wait requires since_id')
+    user_id = require_int(req.acting_user(params.get('user_id')), 'user_id')
+
+    sql, sql_params = build_history_query(chat_id, before_id, since_id, limit)
+    cur = req.cursor
+    # Checked once up front; the long-poll only ever re-runs the same chat's query
+    require_member(cur, chat_id, user_id)
+
+    def fetch_page():
+        cur.execute(sql, sql_params)
+        return fetch_dicts(cur)
+
+    if wait:
+        messages = wait_for_messages(req.conn, chat_id, fetch_page, wait)
+    else:
+        messages = fetch_page()
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    if since_id is None:
+        messages.reverse()
+
+    senders = select_users(cur, (m['sender_id'] for m in messages), fields)
+
+    body = {
+        'messages': messages,
+        'has_more': has_more,
+        'next_before_id': messages[0]['id'] if has_more and since_id is None else None,
+        'last_id': messages[-1]['id'] if messages else since_id
+    }
+
+    if view == 'compact':
+        body['users'] = sideload(senders)
+    else:
+        for message in messages:
+            sender = senders.get(message['sender_id'], {})
+            for field in fields:
+                message[SENDER_KEYS.get(field, f'sender_{field}')] = sender.get(field)
+
+    return body
+
+
+@app.route('POST', 'create_chat')
+def create_chat(req: Request) -> Any:
+    user_id = req.acting_user(req.body.get('user_id'))
+    friend_id = req.body.get('friend_id')
+
+    if not isinstance(user_id, int) or not isinstance(friend_id, int) or user_id == friend_id:
+        raise HttpError(400, 'user_id and friend_id must be two different user ids')
+
+    req.cursor.execute(CREATE_DIRECT_CHAT_SQL, {'user_id': user_id, 'friend_id': friend_id})
+    chat_id, created = req.cursor.fetchone()
+    req.conn.commit()
+
+    return {'chat_id': chat_id, 'created': created}
+
+
+@app.route('POST', 'send_message')
+def send_message(req: Request) -> Any:
+    chat_id = require_int(req.body.get('chat_id'), 'chat_id')
+    sender_id = require_int(req.acting_user(req.body.get('sender_id')), 'sender_id')
+    message_text = req.body.get('message_text')
+
+    if not isinstance(message_text, str) or not message_text.strip():
+        raise HttpError(400, 'message_text required')
+
+    req.cursor.execute(SEND_MESSAGE_SQL, {'chat_id': chat_id, 'sender_id': sender_id, 'message_text': message_text})
+    result = one(req.cursor, 'Chat not found')
+    req.conn.commit()
+
+    return {
+        'message_id': result[0],
+        'created_at': result[1].isoformat()
+    }
+
+
+@app.route('POST', 'mark_read')
+def mark_read(req: Request) -> Any:
+    chat_id = require_int(req.body.get('chat_id'), 'chat_id')
+    user_id = require_int(req.acting_user(req.body.get('user_id')), 'user_id')
+
+    req.cursor.execute(MARK_READ_SQL, (user_id, chat_id))
+    one(req.cursor, 'Chat not found')
+    req.conn.commit()
+
+    return {'success': True, 'unread_count': 0}
+
+
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
     Business: Chat system - create chats, send messages, get chat history
-    Args: event with httpMethod, body, queryStringParameters
+    Args: event with httpMethod, body, queryStringParameters, optional Authorization: Bearer <token>
     Returns: HTTP response with chat data
     '''
-    method: str = event.get('httpMethod', 'GET')
-    
-    if method == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type',
-                'Access-Control-Max-Age': '86400'
-            },
-            'body': ''
-        }
-    
-    dsn = os.environ.get('DATABASE_URL')
-    conn = psycopg2.connect(dsn)
-    cur = conn.cursor()
-    
-    try:
-        if method == 'GET':
-            params = event.get('queryStringParameters', {})
-            action = params.get('action')
-            
-            if action == 'chats':
-                user_id = params.get('user_id')
-                
-                cur.execute("""
-                    SELECT DISTINCT c.id, u.id, u.user_id, u.email, u.avatar_url,
-                           (SELECT message_text FROM messages 
-                            WHERE chat_id = c.id 
-                            ORDER BY created_at DESC LIMIT 1) as last_message,
-                           (SELECT created_at FROM messages 
-                            WHERE chat_id = c.id 
-                            ORDER BY created_at DESC LIMIT 1) as last_message_time
-                    FROM chats c
-                    JOIN chat_participants cp ON c.id = cp.chat_id
-                    JOIN chat_participants cp2 ON c.id = cp2.chat_id AND cp2.user_id = %s
-                    JOIN users u ON cp.user_id = u.id AND u.id != %s
-                    ORDER BY last_message_time DESC NULLS LAST
-                """, (user_id, user_id))
-                
-                chats = cur.fetchall()
-                
-                data = [{
-                    'chat_id': c[0],
-                    'friend_id': c[1],
-                    'friend_user_id': c[2],
-                    'friend_email': c[3],
-                    'friend_avatar': c[4],
-                    'last_message': c[5],
-                    'last_message_time': c[6].isoformat() if c[6] else None
-                } for c in chats]
-                
-                return {
-                    'statusCode': 200,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'chats': data}),
-                    'isBase64Encoded': False
-                }
-            
-            elif action == 'messages':
-                chat_id = params.get('chat_id')
-                
-                cur.execute("""
-                    SELECT m.id, m.sender_id, m.message_text, m.created_at, u.email, u.avatar_url
-                    FROM messages m
-                    JOIN users u ON m.sender_id = u.id
-                    WHERE m.chat_id = %s
-                    ORDER BY m.created_at ASC
-                """, (chat_id,))
-                
-                messages = cur.fetchall()
-                
-                data = [{
-                    'id': m[0],
-                    'sender_id': m[1],
-                    'text': m[2],
-                    'created_at': m[3].isoformat(),
-                    'sender_email': m[4],
-                    'sender_avatar': m[5]
-                } for m in messages]
-                
-                return {
-                    'statusCode': 200,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'messages': data}),
-                    'isBase64Encoded': False
-                }
-        
-        elif method == 'POST':
-            body_data = json.loads(event.get('body', '{}'))
-            action = body_data.get('action')
-            
-            if action == 'create_chat':
-                user_id = body_data.get('user_id')
-                friend_id = body_data.get('friend_id')
-                
-                # Check if chat already exists
-                cur.execute("""
-                    SELECT c.id FROM chats c
-                    JOIN chat_participants cp1 ON c.id = cp1.chat_id AND cp1.user_id = %s
-                    JOIN chat_participants cp2 ON c.id = cp2.chat_id AND cp2.user_id = %s
-                """, (user_id, friend_id))
-                
-                existing_chat = cur.fetchone()
-                
-                if existing_chat:
-                    chat_id = existing_chat[0]
-                else:
-                    cur.execute("INSERT INTO chats DEFAULT VALUES RETURNING id")
-                    chat_id = cur.fetchone()[0]
-                    
-                    cur.execute(
-                        "INSERT INTO chat_participants (chat_id, user_id) VALUES (%s, %s), (%s, %s)",
-                        (chat_id, user_id, chat_id, friend_id)
-                    )
-                    conn.commit()
-                
-                return {
-                    'statusCode': 200,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'chat_id': chat_id}),
-                    'isBase64Encoded': False
-                }
-            
-            elif action == 'send_message':
-                chat_id = body_data.get('chat_id')
-                sender_id = body_data.get('sender_id')
-                message_text = body_data.get('message_text')
-                
-                cur.execute(
-                    "INSERT INTO messages (chat_id, sender_id, message_text) VALUES (%s, %s, %s) RETURNING id, created_at",
-                    (chat_id, sender_id, message_text)
-                )
-                result = cur.fetchone()
-                conn.commit()
-                
-                return {
-                    'statusCode': 200,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({
-                        'message_id': result[0],
-                        'created_at': result[1].isoformat()
-                    }),
-                    'isBase64Encoded': False
-                }
-    
-    finally:
-        cur.close()
-        conn.close()
+    return app(event, context)
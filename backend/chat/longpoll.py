@@ -0,0 +1,74 @@
+import os
+import select
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+from psycopg2 import sql
+
+from history import InvalidPage
+
+MAX_WAIT_SECONDS = float(os.environ.get('CHAT_LONG_POLL_MAX_WAIT', '25'))
+MAX_WAITERS = int(os.environ.get('CHAT_LONG_POLL_MAX_WAITERS', '2'))
+
+# Each waiter holds a pooled connection for the whole wait, so keep this below
+# the pool size to leave room for regular requests.
+_waiters = threading.BoundedSemaphore(MAX_WAITERS)
+
+
+def channel_for(chat_id: int) -> str:
+    return f'chat_{chat_id}'
+
+
+def parse_wait(params: Dict[str, Any]) -> float:
+    raw = params.get('wait')
+    if raw in (None, ''):
+        return 0.0
+    try:
+        wait = float(raw)
+    except (TypeError, ValueError):
+        raise InvalidPage('wait must be a number of seconds')
+    if wait < 0:
+        raise InvalidPage('wait must not be negative')
+    return min(wait, MAX_WAIT_SECONDS)
+
+
+def wait_for_messages(conn: Any, chat_id: int, fetch: Callable[[], List[Any]], timeout: float) -> List[Any]:
+    '''
+    Business: Block until send_message notifies the chat channel or timeout passes
+    Args: pooled connection, chat id, fetch - runs the since_id query, timeout in seconds
+    Returns: rows from fetch, empty when nothing arrived; fetches once without waiting when all waiter slots are busy
+    '''
+    if not _waiters.acquire(blocking=False):
+        return fetch()
+
+    channel = sql.Identifier(channel_for(chat_id))
+    cur = conn.cursor()
+    try:
+        # Listen before the first fetch so a message landing in between still wakes us
+        cur.execute(sql.SQL('LISTEN {}').format(channel))
+        conn.commit()
+
+        rows = fetch()
+        conn.commit()
+        deadline = time.monotonic() + timeout
+        while not rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if select.select([conn], [], [], remaining) == ([], [], []):
+                break
+            conn.poll()
+            if conn.notifies:
+                del conn.notifies[:]
+                rows = fetch()
+                conn.commit()
+        return rows
+    finally:
+        try:
+            cur.execute(sql.SQL('UNLISTEN {}').format(channel))
+            conn.commit()
+            del conn.notifies[:]
+        finally:
+            cur.close()
+            _waiters.release()
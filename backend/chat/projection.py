@@ -0,0 +1,49 @@
+from typing import Any, Dict, Iterable, Tuple
+
+from runtime import InvalidInput
+
+USER_FIELDS = ('user_id', 'email', 'is_creator', 'avatar_url')
+VIEWS = ('full', 'compact')
+
+
+class InvalidProjection(InvalidInput):
+    pass
+
+
+def parse_projection(params: Dict[str, Any], default_fields: Tuple[str, ...] = USER_FIELDS) -> Tuple[str, Tuple[str, ...]]:
+    '''
+    Business: Read how user data should be shaped in a list response
+    Args: queryStringParameters with optional view (full|compact) and fields (comma separated)
+    Returns: view and the user fields to include
+
+    full repeats the user fields on every row, compact leaves only user ids on the
+    rows and side-loads each user once in a users dictionary keyed by id.
+    '''
+    view = params.get('view') or 'full'
+    if view not in VIEWS:
+        raise InvalidProjection(f'view must be one of: {", ".join(VIEWS)}')
+    raw = params.get('fields')
+    if not raw:
+        return view, default_fields
+    fields = tuple(dict.fromkeys(field.strip() for field in raw.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in USER_FIELDS]
+    if unknown:
+        raise InvalidProjection(f'Unknown fields: {", ".join(unknown)}')
+    return view, fields
+
+
+def user_columns(fields: Tuple[str, ...], alias: str = 'u') -> str:
+    # Field names are checked against USER_FIELDS, so they are safe to inline
+    return ', '.join(f'{alias}.{column}' for column in ('id',) + fields)
+
+
+def select_users(cur: Any, ids: Iterable[int], fields: Tuple[str, ...]) -> Dict[int, Dict[str, Any]]:
+    ids = list(set(ids))
+    if not ids:
+        return {}
+    cur.execute(f"SELECT {user_columns(fields)} FROM users u WHERE u.id = ANY(%s)", (ids,))
+    return {row[0]: dict(zip(fields, row[1:])) for row in cur.fetchall()}
+
+
+def sideload(users: Dict[int, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    return {str(user_id): data for user_id, data in users.items()}
@@ -0,0 +1,96 @@
+import base64
+import datetime
+import decimal
+import gzip
+import json
+from typing import Any, Dict, List, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Smaller bodies are not worth the CPU and the base64 overhead
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def dumps(data: Any) -> bytes:
+    '''JSON bytes; datetimes become ISO strings like datetime.isoformat()'''
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, default=_default).encode()
+
+
+def fetch_dicts(cur: Any) -> List[Dict[str, Any]]:
+    '''Rows of the last query as dicts keyed by column name (use AS to rename)'''
+    names = [column[0] for column in cur.description]
+    return [dict(zip(names, row)) for row in cur.fetchall()]
+
+
+def _header(event: Optional[Dict[str, Any]], name: str) -> str:
+    for key, value in ((event or {}).get('headers') or {}).items():
+        if key.lower() == name:
+            return value or ''
+    return ''
+
+
+def _accepted_encodings(event: Optional[Dict[str, Any]]) -> List[str]:
+    encodings = []
+    for part in _header(event, 'accept-encoding').split(','):
+        coding, _, params = part.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0'):
+            continue
+        encodings.append(coding.strip().lower())
+    return encodings
+
+
+def json_response(status: int, data: Any, event: Optional[Dict[str, Any]] = None,
+                  headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    '''
+    Business: Build the function response for a JSON body
+    Args: status code, body data, the invocation event (for Accept-Encoding), extra headers
+    Returns: response dict; large bodies are br/gzip compressed when the client accepts it
+    '''
+    body = dumps(data)
+    response_headers = {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}
+    if headers:
+        response_headers.update(headers)
+
+    if len(body) >= COMPRESS_MIN_BYTES:
+        accepted = _accepted_encodings(event)
+        encoding = None
+        if brotli is not None and 'br' in accepted:
+            body, encoding = brotli.compress(body, quality=BROTLI_QUALITY), 'br'
+        elif 'gzip' in accepted:
+            body, encoding = gzip.compress(body, compresslevel=GZIP_LEVEL), 'gzip'
+        if encoding:
+            response_headers['Content-Encoding'] = encoding
+            response_headers['Vary'] = 'Accept-Encoding'
+            return {
+                'statusCode': status,
+                'headers': response_headers,
+                'body': base64.b64encode(body).decode(),
+                'isBase64Encoded': True
+            }
+
+    return {
+        'statusCode': status,
+        'headers': response_headers,
+        'body': body.decode(),
+        'isBase64Encoded': False
+    }
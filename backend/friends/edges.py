@@ -0,0 +1,140 @@
+from typing import Any, Dict, Optional, Tuple
+
+from projection import USER_FIELDS, user_columns
+from runtime import InvalidInput
+
+STATUSES = ('pending', 'accepted', 'rejected')
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+
+
+class InvalidRequest(InvalidInput):
+    pass
+
+
+def _optional_int(params: Dict[str, Any], name: str) -> Optional[int]:
+    raw = params.get(name)
+    if raw in (None, ''):
+        return None
+    try:
+        value = int(raw)
+    except (TypeError, ValueError):
+        raise InvalidRequest(f'{name} must be an integer')
+    if value < 1:
+        raise InvalidRequest(f'{name} must be positive')
+    return value
+
+
+def parse_list_params(params: Dict[str, Any]) -> Tuple[int, Optional[str], Optional[int], int]:
+    '''
+    Business: Validate a friends list request
+    Args: queryStringParameters with user_id, optional status, before_id, limit
+    Returns: user_id, status, before_id and a clamped page size
+    '''
+    user_id = _optional_int(params, 'user_id')
+    if user_id is None:
+        raise InvalidRequest('user_id required')
+    status = params.get('status') or None
+    if status is not None and status not in STATUSES:
+        raise InvalidRequest(f'status must be one of: {", ".join(STATUSES)}')
+    before_id = _optional_int(params, 'before_id')
+    limit = min(_optional_int(params, 'limit') or DEFAULT_LIMIT, MAX_LIMIT)
+    return user_id, status, before_id, limit
+
+
+def build_friends_query(user_id: int, status: Optional[str], before_id: Optional[int], limit: int,
+                        fields: Tuple[str, ...] = USER_FIELDS) -> Tuple[str, Dict[str, Any]]:
+    '''
+    Business: Friends of a user as two index range scans, newest friendship first
+    Args: user id, optional status filter, keyset cursor on friendship id, page size, user fields to select
+    Returns: SQL and params fetching limit + 1 rows of user id, fields, status, friendship id
+    '''
+    filters = ''
+    if status is not None:
+        filters += ' AND f.status = %(status)s'
+    if before_id is not None:
+        filters += ' AND f.id < %(before_id)s'
+
+    sql = f"""
+        SELECT {user_columns(fields)}, e.status, e.friendship_id
+        FROM (
+            (SELECT f.friend_id AS other_id, f.status, f.id AS friendship_id
+             FROM friendships f
+             WHERE f.user_id = %(user_id)s{filters}
+             ORDER BY f.id DESC
+             LIMIT %(fetch)s)
+            UNION ALL
+            (SELECT f.user_id AS other_id, f.status, f.id AS friendship_id
+             FROM friendships f
+             WHERE f.friend_id = %(user_id)s{filters}
+             ORDER BY f.id DESC
+             LIMIT %(fetch)s)
+        ) e
+        JOIN users u ON u.id = e.other_id
+        WHERE u.id <> %(user_id)s
+        ORDER BY e.friendship_id DESC
+        LIMIT %(fetch)s
+    """
+    return sql, {'user_id': user_id, 'status': status, 'before_id': before_id, 'fetch': limit + 1}
+
+
+MAX_BATCH = 500
+ACTION_STATUSES = {'accept': 'accepted', 'reject': 'rejected'}
+
+# Resolves every target user_id in one pass and inserts all new requests with
+# one multi-row insert; the outer select reports what happened to each target.
+SEND_REQUESTS_SQL = """
+    WITH targets AS (
+        SELECT t.user_id AS requested, u.id
+        FROM unnest(%(targets)s::text[]) AS t(user_id)
+        LEFT JOIN users u ON u.user_id = t.user_id
+    ), inserted AS (
+        INSERT INTO friendships (user_id, friend_id, status)
+        SELECT %(user_id)s, id, 'pending' FROM targets
+        WHERE id IS NOT NULL AND id <> %(user_id)s
+        ON CONFLICT (user_id, friend_id) DO NOTHING
+        RETURNING friend_id, id
+    )
+    SELECT t.requested, t.id, i.id
+    FROM targets t
+    LEFT JOIN inserted i ON i.friend_id = t.id
+"""
+
+SET_STATUS_SQL = """
+    WITH requested AS (
+        SELECT unnest(%(ids)s::int[]) AS id
+    ), updated AS (
+        UPDATE friendships f SET status = %(status)s
+        FROM requested r
+        WHERE f.id = r.id
+          AND (%(recipient_id)s::int IS NULL OR f.friend_id = %(recipient_id)s)
+        RETURNING f.id
+    )
+    SELECT r.id, u.id IS NOT NULL
+    FROM requested r
+    LEFT JOIN updated u ON u.id = r.id
+"""
+
+
+def parse_batch(values: Any, name: str, item_type: type) -> list:
+    '''
+    Business: Validate and dedupe the list of a batch request
+    Args: raw list from the body, its field name for errors, expected item type
+    Returns: distinct items in request order
+    '''
+    if not isinstance(values, list) or not values:
+        raise InvalidRequest(f'{name} must be a non-empty list')
+    if len(values) > MAX_BATCH:
+        raise InvalidRequest(f'At most {MAX_BATCH} items in {name}')
+    if not all(isinstance(value, item_type) and not isinstance(value, bool) for value in values):
+        raise InvalidRequest(f'{name} must contain only {item_type.__name__} values')
+    return list(dict.fromkeys(values))
+
+
+def request_outcome(row: tuple, user_id: int) -> str:
+    requested, target_id, friendship_id = row
+    if target_id is None:
+        return 'not_found'
+    if target_id == user_id:
+        return 'self'
+    return 'sent' if friendship_id is not None else 'exists'
@@ -1,119 +1,103 @@
-import json
-import os
-import psycopg2
 from typing import Dict, Any
 
+from edges import (
+    ACTION_STATUSES, SEND_REQUESTS_SQL, SET_STATUS_SQL, InvalidRequest,
+    build_friends_query, parse_batch, parse_list_params, request_outcome,
+)
+from projection import parse_projection, sideload
+from runtime import HttpError, Request, Router
+
+app = Router()
+
+
+@app.route('GET')
+def list_friends(req: Request) -> Any:
+    params = req.params
+    if req.session is not None:
+        params = dict(params, user_id=str(req.acting_user(params.get('user_id'))))
+
+    user_id, status, before_id, limit = parse_list_params(params)
+    view, fields = parse_projection(params)
+
+    sql, sql_params = build_friends_query(user_id, status, before_id, limit, fields)
+    req.cursor.execute(sql, sql_params)
+
+    friends = req.cursor.fetchall()
+    has_more = len(friends) > limit
+    friends = friends[:limit]
+
+    users = {f[0]: dict(zip(fields, f[1:-2])) for f in friends}
+    data = [{'id': f[0], 'status': f[-2], 'friendship_id': f[-1]} for f in friends]
+
+    body = {
+        'friends': data,
+        'next_before_id': data[-1]['friendship_id'] if has_more else None
+    }
+
+    if view == 'compact':
+        body['users'] = sideload(users)
+    else:
+        for friend in data:
+            friend.update(users[friend['id']])
+
+    return body
+
+
+@app.route('POST')
+def send_requests(req: Request) -> Any:
+    user_id = req.acting_user(req.body.get('user_id'))
+    is_batch = 'friend_user_ids' in req.body
+
+    if not isinstance(user_id, int):
+        raise InvalidRequest('user_id required')
+    if is_batch:
+        targets = parse_batch(req.body.get('friend_user_ids'), 'friend_user_ids', str)
+    else:
+        targets = parse_batch([req.body.get('friend_user_id')], 'friend_user_id', str)
+
+    req.cursor.execute(SEND_REQUESTS_SQL, {'user_id': user_id, 'targets': targets})
+    outcomes = {row[0]: request_outcome(row, user_id) for row in req.cursor.fetchall()}
+    req.conn.commit()
+
+    if is_batch:
+        return {'success': True, 'results': outcomes}
+
+    if outcomes[targets[0]] == 'not_found':
+        raise HttpError(404, 'User not found')
+
+    return {'success': True, 'message': 'Friend request sent'}
+
+
+@app.route('PUT')
+def answer_requests(req: Request) -> Any:
+    action = req.body.get('action')
+    is_batch = 'friendship_ids' in req.body
+
+    if action not in ACTION_STATUSES:
+        raise InvalidRequest('action must be accept or reject')
+    if is_batch:
+        friendship_ids = parse_batch(req.body.get('friendship_ids'), 'friendship_ids', int)
+    else:
+        friendship_ids = parse_batch([req.body.get('friendship_id')], 'friendship_id', int)
+
+    status = ACTION_STATUSES[action]
+    # With a session only requests addressed to its user can be answered
+    recipient_id = req.session['sub'] if req.session is not None else None
+    req.cursor.execute(SET_STATUS_SQL, {'ids': friendship_ids, 'status': status, 'recipient_id': recipient_id})
+    outcomes = {str(row[0]): status if row[1] else 'not_found' for row in req.cursor.fetchall()}
+    req.conn.commit()
+
+    body = {'success': True}
+    if is_batch:
+        body['results'] = outcomes
+
+    return body
+
+
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
     Business: Friend management system - send requests, accept, reject, list friends
-    Args: event with httpMethod, body, queryStringParameters
+    Args: event with httpMethod, body, queryStringParameters, optional Authorization: Bearer <token>
     Returns: HTTP response with friendship data
     '''
-    method: str = event.get('httpMethod', 'GET')
-    
-    if method == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, POST, PUT, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type',
-                'Access-Control-Max-Age': '86400'
-            },
-            'body': ''
-        }
-    
-    dsn = os.environ.get('DATABASE_URL')
-    conn = psycopg2.connect(dsn)
-    cur = conn.cursor()
-    
-    try:
-        if method == 'GET':
-            params = event.get('queryStringParameters', {})
-            user_id = params.get('user_id')
-            
-            cur.execute("""
-                SELECT u.id, u.user_id, u.email, u.is_creator, u.avatar_url, f.status, f.id
-                FROM friendships f
-                JOIN users u ON (f.friend_id = u.id OR f.user_id = u.id)
-                WHERE (f.user_id = %s OR f.friend_id = %s) AND u.id != %s
-            """, (user_id, user_id, user_id))
-            
-            friends = cur.fetchall()
-            
-            data = [{
-                'id': f[0],
-                'user_id': f[1],
-                'email': f[2],
-                'is_creator': f[3],
-                'avatar_url': f[4],
-                'status': f[5],
-                'friendship_id': f[6]
-            } for f in friends]
-            
-            return {
-                'statusCode': 200,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'friends': data}),
-                'isBase64Encoded': False
-            }
-        
-        elif method == 'POST':
-            body_data = json.loads(event.get('body', '{}'))
-            user_id = body_data.get('user_id')
-            friend_user_id = body_data.get('friend_user_id')
-            
-            cur.execute("SELECT id FROM users WHERE user_id = %s", (friend_user_id,))
-            friend = cur.fetchone()
-            
-            if not friend:
-                return {
-                    'statusCode': 404,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'User not found'}),
-                    'isBase64Encoded': False
-                }
-            
-            friend_id = friend[0]
-            
-            cur.execute(
-                "INSERT INTO friendships (user_id, friend_id, status) VALUES (%s, %s, 'pending') ON CONFLICT DO NOTHING",
-                (user_id, friend_id)
-            )
-            conn.commit()
-            
-            return {
-                'statusCode': 200,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'success': True, 'message': 'Friend request sent'}),
-                'isBase64Encoded': False
-            }
-        
-        elif method == 'PUT':
-            body_data = json.loads(event.get('body', '{}'))
-            friendship_id = body_data.get('friendship_id')
-            action = body_data.get('action')
-            
-            if action == 'accept':
-                cur.execute(
-                    "UPDATE friendships SET status = 'accepted' WHERE id = %s",
-                    (friendship_id,)
-                )
-            elif action == 'reject':
-                cur.execute(
-                    "UPDATE friendships SET status = 'rejected' WHERE id = %s",
-                    (friendship_id,)
-                )
-            
-            conn.commit()
-            
-            return {
-                'statusCode': 200,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'success': True}),
-                'isBase64Encoded': False
-            }
-    
-    finally:
-        cur.close()
-        conn.close()
\ No newline at end of file
+    return app(event, context)
@@ -0,0 +1,161 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+TOKEN_TTL_SECONDS = int(os.environ.get('SESSION_TOKEN_TTL', str(7 * 24 * 3600)))
+KEYS_REFRESH_SECONDS = float(os.environ.get('SESSION_KEYS_REFRESH', '300'))
+CLOCK_SKEW_SECONDS = 30
+
+
+class AuthError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+class KeySet:
+    '''
+    Business: HMAC keys for session tokens, cached and re-read periodically for rotation
+    Args: SESSION_KEYS ("kid:secret,kid:secret") or SESSION_KEYS_FILE (JSON {kid: secret}), SESSION_SIGNING_KID
+    Returns: the signing key and any verification key by kid
+
+    Rotate by adding the new key, switching SESSION_SIGNING_KID to it, and
+    removing the old key once its tokens have expired.
+    '''
+
+    def __init__(self, refresh_seconds: float = KEYS_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._keys: Dict[str, bytes] = {}
+        self._signing_kid: Optional[str] = None
+        self._loaded_at = float('-inf')
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        keys: Dict[str, str] = {}
+        path = os.environ.get('SESSION_KEYS_FILE')
+        if path and os.path.exists(path):
+            with open(path) as f:
+                keys.update(json.load(f))
+        for item in os.environ.get('SESSION_KEYS', '').split(','):
+            kid, sep, secret = item.strip().partition(':')
+            if sep and kid and secret:
+                keys[kid] = secret
+        self._keys = {kid: secret.encode() for kid, secret in keys.items()}
+        signing_kid = os.environ.get('SESSION_SIGNING_KID')
+        if signing_kid not in self._keys:
+            signing_kid = sorted(self._keys)[-1] if self._keys else None
+        self._signing_kid = signing_kid
+        self._loaded_at = time.monotonic()
+
+    def _fresh(self) -> None:
+        if time.monotonic() - self._loaded_at >= self.refresh_seconds:
+            with self._lock:
+                if time.monotonic() - self._loaded_at >= self.refresh_seconds:
+                    self._load()
+
+    def signing_key(self) -> Optional[Tuple[str, bytes]]:
+        self._fresh()
+        if self._signing_kid is None:
+            return None
+        return self._signing_kid, self._keys[self._signing_kid]
+
+    def get(self, kid: str) -> Optional[bytes]:
+        self._fresh()
+        return self._keys.get(kid)
+
+
+KEYS = KeySet()
+
+
+def tokens_required() -> bool:
+    '''When false, requests without a token fall back to the raw user ids they send'''
+    return os.environ.get('REQUIRE_SESSION_TOKEN', '') in ('1', 'true')
+
+
+def issue_token(claims: Dict[str, Any], ttl: int = TOKEN_TTL_SECONDS) -> Optional[Tuple[str, int]]:
+    '''
+    Business: Sign an expiring HS256 JWT with the current signing key
+    Args: claims (sub, creator, admin, ...), lifetime in seconds
+    Returns: token and its expiry as unix time, None when no key is configured
+    '''
+    key = KEYS.signing_key()
+    if key is None:
+        return None
+    kid, secret = key
+    now = int(time.time())
+    payload = dict(claims, iat=now, exp=now + ttl)
+    header = {'alg': 'HS256', 'typ': 'JWT', 'kid': kid}
+    signing_input = '.'.join([
+        _b64encode(json.dumps(header, separators=(',', ':')).encode()),
+        _b64encode(json.dumps(payload, separators=(',', ':')).encode())
+    ])
+    signature = hmac.new(secret, signing_input.encode(), hashlib.sha256).digest()
+    return f'{signing_input}.{_b64encode(signature)}', payload['exp']
+
+
+def verify_token(token: str) -> Dict[str, Any]:
+    '''
+    Business: Check signature and expiry of a session token without touching the database
+    Args: token string
+    Returns: its claims; raises AuthError(401) when it is malformed, forged or expired
+    '''
+    try:
+        header_b64, payload_b64, signature_b64 = token.split('.')
+        header = json.loads(_b64decode(header_b64))
+        signature = _b64decode(signature_b64)
+    except (ValueError, TypeError):
+        raise AuthError(401, 'Malformed session token')
+    if not isinstance(header, dict) or header.get('alg') != 'HS256':
+        raise AuthError(401, 'Unsupported session token')
+    secret = KEYS.get(str(header.get('kid')))
+    if secret is None:
+        raise AuthError(401, 'Unknown session key')
+    expected = hmac.new(secret, f'{header_b64}.{payload_b64}'.encode(), hashlib.sha256).digest()
+    if not hmac.compare_digest(expected, signature):
+        raise AuthError(401, 'Invalid session token')
+    try:
+        claims = json.loads(_b64decode(payload_b64))
+    except ValueError:
+        raise AuthError(401, 'Malformed session token')
+    if not isinstance(claims, dict) or claims.get('exp', 0) + CLOCK_SKEW_SECONDS < time.time():
+        raise AuthError(401, 'Session expired')
+    return claims
+
+
+def authenticate(event: Dict[str, Any], required: bool = True) -> Optional[Dict[str, Any]]:
+    '''Claims of the Bearer token in the Authorization header, None when there is none and none is required'''
+    for name, value in (event.get('headers') or {}).items():
+        if name.lower() == 'authorization' and value:
+            scheme, _, token = value.partition(' ')
+            if scheme.lower() != 'bearer' or not token:
+                raise AuthError(401, 'Authorization must be a Bearer token')
+            return verify_token(token.strip())
+    if required and tokens_required():
+        raise AuthError(401, 'Session token required')
+    return None
+
+
+def acting_user(session: Optional[Dict[str, Any]], claimed: Any) -> Any:
+    '''
+    Business: Decide which user a request acts for
+    Args: verified claims or None, the user id sent in the query or body
+    Returns: the token subject; the claimed id only for token-less requests
+    '''
+    if session is None:
+        return claimed
+    if claimed not in (None, '') and str(claimed) != str(session['sub']):
+        raise AuthError(403, 'user_id does not match the session')
+    return session['sub']
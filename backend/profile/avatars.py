@@ -0,0 +1,91 @@
+import base64
+import binascii
+import hashlib
+import io
+from typing import Dict, Optional
+
+from PIL import Image, ImageOps
+
+from blobstore import BlobStore
+from runtime import InvalidInput
+
+THUMBNAIL_SIZES = (64, 256)
+DISPLAY_SIZE = 256
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+MAX_REFERENCE_LENGTH = 512
+JPEG_QUALITY = 85
+
+
+class InvalidAvatar(InvalidInput):
+    pass
+
+
+def decode_data_uri(value: str) -> bytes:
+    header, sep, payload = value.partition(',')
+    if not sep or not header.startswith('data:image/') or not header.endswith(';base64'):
+        raise InvalidAvatar('Avatar must be a base64 image data URI')
+    if len(payload) > MAX_UPLOAD_BYTES * 4 // 3 + 4:
+        raise InvalidAvatar('Avatar is too large')
+    try:
+        return base64.b64decode(payload, validate=True)
+    except (binascii.Error, ValueError):
+        raise InvalidAvatar('Avatar is not valid base64')
+
+
+def make_thumbnails(data: bytes) -> Dict[int, bytes]:
+    '''
+    Business: Square JPEG thumbnails of an uploaded image in every THUMBNAIL_SIZES size
+    Args: raw image bytes in any format Pillow reads
+    Returns: thumbnail bytes by edge length
+    '''
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+    except (OSError, Image.DecompressionBombError):
+        raise InvalidAvatar('Avatar is not a readable image')
+
+    image = ImageOps.exif_transpose(image).convert('RGB')
+    thumbnails = {}
+    for size in THUMBNAIL_SIZES:
+        thumb = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        out = io.BytesIO()
+        thumb.save(out, 'JPEG', quality=JPEG_QUALITY, optimize=True)
+        thumbnails[size] = out.getvalue()
+    return thumbnails
+
+
+def avatar_key(digest: str, size: int) -> str:
+    return f'avatars/{digest}/{size}.jpg'
+
+
+def store_avatar(data: bytes, store: BlobStore) -> str:
+    '''
+    Business: Store thumbnails of an image under its content hash
+    Args: raw image bytes, blob store
+    Returns: URL of the display-size thumbnail; re-uploading the same image writes nothing
+    '''
+    digest = hashlib.sha256(data).hexdigest()
+    display_key = avatar_key(digest, DISPLAY_SIZE)
+    if not store.exists(display_key):
+        # Display size is written last so its presence means the set is complete
+        thumbnails = make_thumbnails(data)
+        for size in sorted(thumbnails, key=lambda s: s == DISPLAY_SIZE):
+            store.put(avatar_key(digest, size), thumbnails[size], 'image/jpeg')
+    return store.url(display_key)
+
+
+def ingest_avatar(value: Optional[str], store: BlobStore) -> Optional[str]:
+    '''
+    Business: Turn the avatar_url sent by a client into the short reference kept in users
+    Args: data URI, existing URL, or empty to clear the avatar
+    Returns: URL to store in users.avatar_url or None
+    '''
+    if not value:
+        return None
+    if not isinstance(value, str):
+        raise InvalidAvatar('avatar_url must be a string')
+    if value.startswith('data:'):
+        return store_avatar(decode_data_uri(value), store)
+    if not value.startswith(('https://', 'http://')) or len(value) > MAX_REFERENCE_LENGTH:
+        raise InvalidAvatar('avatar_url must be an image data URI or a URL')
+    return value
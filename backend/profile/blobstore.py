@@ -0,0 +1,119 @@
+import os
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from runtime import ConfigError
+
+STORES = ('s3', 'local')
+
+
+class BlobStore(ABC):
+    '''
+    Business: Write-once storage for content-addressed files
+    Args: keys are paths like avatars/<sha256>/256.jpg
+    Returns: public URLs of stored keys
+    '''
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        pass
+
+    @abstractmethod
+    def put(self, key: str, data: bytes, content_type: str) -> None:
+        pass
+
+    @abstractmethod
+    def url(self, key: str) -> str:
+        pass
+
+
+class LocalBlobStore(BlobStore):
+    '''Files under a local directory, for tests and the harness; never for deployed functions'''
+
+    def __init__(self, root: str, base_url: str):
+        self.root = root
+        self.base_url = base_url.rstrip('/')
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split('/'))
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def put(self, key: str, data: bytes, content_type: str) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so readers never see a partial file
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def url(self, key: str) -> str:
+        return f'{self.base_url}/{key}'
+
+
+class S3BlobStore(BlobStore):
+    '''Objects in an S3-compatible bucket served from a public base URL'''
+
+    def __init__(self, bucket: str, public_base_url: str, endpoint_url: Optional[str] = None):
+        import boto3
+        import botocore.exceptions
+
+        self.bucket = bucket
+        self.public_base_url = public_base_url.rstrip('/')
+        self._client = boto3.client('s3', endpoint_url=endpoint_url)
+        self._client_error = botocore.exceptions.ClientError
+
+    def exists(self, key: str) -> bool:
+        try:
+            self._client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except self._client_error:
+            return False
+
+    def put(self, key: str, data: bytes, content_type: str) -> None:
+        self._client.put_object(
+            Bucket=self.bucket,
+            Key=key,
+            Body=data,
+            ContentType=content_type,
+            CacheControl='public, max-age=31536000, immutable'
+        )
+
+    def url(self, key: str) -> str:
+        return f'{self.public_base_url}/{key}'
+
+
+_store = None
+
+
+def _required(name: str) -> str:
+    value = os.environ.get(name)
+    if not value:
+        raise ConfigError(f'{name} is not configured')
+    return value
+
+
+def get_blob_store() -> BlobStore:
+    '''
+    Business: Blob store configured for this function
+    Args: BLOB_STORE=s3 with BLOB_S3_BUCKET, BLOB_PUBLIC_URL (BLOB_S3_ENDPOINT optional),
+          or BLOB_STORE=local with BLOB_LOCAL_ROOT, BLOB_PUBLIC_URL for tests and the harness
+    Returns: the store; ConfigError (503) when the settings are missing, so avatars never
+             land in a throwaway container directory by default
+    '''
+    global _store
+    if _store is None:
+        kind = _required('BLOB_STORE')
+        if kind == 's3':
+            _store = S3BlobStore(
+                _required('BLOB_S3_BUCKET'),
+                _required('BLOB_PUBLIC_URL'),
+                os.environ.get('BLOB_S3_ENDPOINT')
+            )
+        elif kind == 'local':
+            _store = LocalBlobStore(_required('BLOB_LOCAL_ROOT'), _required('BLOB_PUBLIC_URL'))
+        else:
+            raise ConfigError(f'BLOB_STORE must be one of: {", ".join(STORES)}')
+    return _store
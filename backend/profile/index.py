@@ -1,98 +1,64 @@
-import json
-import os
-import psycopg2
 from typing import Dict, Any
 
+from avatars import ingest_avatar
+from blobstore import get_blob_store
+from runtime import HttpError, Request, Router, one
+
+app = Router()
+
+
+@app.route('GET', public=True)
+def get_profile(req: Request) -> Any:
+    user_id = req.params.get('user_id')
+
+    if not user_id:
+        raise HttpError(400, 'user_id required')
+
+    req.cursor.execute(
+        "SELECT id, user_id, email, is_creator, avatar_url, created_at FROM users WHERE id = %s",
+        (user_id,)
+    )
+    user = one(req.cursor, 'User not found')
+
+    return {
+        'id': user[0],
+        'user_id': user[1],
+        'email': user[2],
+        'is_creator': user[3],
+        'avatar_url': user[4],
+        'created_at': str(user[5])
+    }
+
+
+@app.route('PUT')
+def update_avatar(req: Request) -> Any:
+    user_id = req.acting_user(req.body.get('user_id'))
+
+    if not isinstance(user_id, int) or isinstance(user_id, bool):
+        raise HttpError(400, 'user_id must be an integer')
+
+    avatar_url = ingest_avatar(req.body.get('avatar_url'), get_blob_store())
+
+    req.cursor.execute(
+        "UPDATE users SET avatar_url = %s WHERE id = %s RETURNING id, user_id, email, is_creator, avatar_url",
+        (avatar_url, user_id)
+    )
+    user = one(req.cursor, 'User not found')
+    req.conn.commit()
+
+    return {
+        'id': user[0],
+        'user_id': user[1],
+        'email': user[2],
+        'is_creator': user[3],
+        'avatar_url': user[4]
+    }
+
+
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
-    Business: User profile management with base64 avatar upload from phone
-    Args: event with httpMethod, body, queryStringParameters
+    Business: User profile management with base64 avatar upload from phone stored as thumbnails
+    Args: event with httpMethod, body, queryStringParameters, optional Authorization: Bearer <token>
     Returns: HTTP response with profile data
     '''
-    method: str = event.get('httpMethod', 'GET')
-    
-    if method == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, POST, PUT, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type',
-                'Access-Control-Max-Age': '86400'
-            },
-            'body': ''
-        }
-    
-    dsn = os.environ.get('DATABASE_URL')
-    conn = psycopg2.connect(dsn)
-    cur = conn.cursor()
-    
-    try:
-        if method == 'GET':
-            params = event.get('queryStringParameters', {})
-            user_id = params.get('user_id')
-            
-            if not user_id:
-                return {
-                    'statusCode': 400,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'user_id required'}),
-                    'isBase64Encoded': False
-                }
-            
-            cur.execute(
-                "SELECT id, user_id, email, is_creator, avatar_url, created_at FROM users WHERE id = %s",
-                (user_id,)
-            )
-            user = cur.fetchone()
-            
-            if not user:
-                return {
-                    'statusCode': 404,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'User not found'}),
-                    'isBase64Encoded': False
-                }
-            
-            return {
-                'statusCode': 200,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({
-                    'id': user[0],
-                    'user_id': user[1],
-                    'email': user[2],
-                    'is_creator': user[3],
-                    'avatar_url': user[4],
-                    'created_at': str(user[5])
-                }),
-                'isBase64Encoded': False
-            }
-        
-        elif method == 'PUT':
-            body_data = json.loads(event.get('body', '{}'))
-            user_id = body_data.get('user_id')
-            avatar_url = body_data.get('avatar_url')
-            
-            cur.execute(
-                "UPDATE users SET avatar_url = %s WHERE id = %s RETURNING id, user_id, email, is_creator, avatar_url",
-                (avatar_url, user_id)
-            )
-            user = cur.fetchone()
-            conn.commit()
-            
-            return {
-                'statusCode': 200,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({
-                    'id': user[0],
-                    'user_id': user[1],
-                    'email': user[2],
-                    'is_creator': user[3],
-                    'avatar_url': user[4]
-                }),
-                'isBase64Encoded': False
-            }
-    
-    finally:
-        cur.close()
-        conn.close()
\ No newline at end of file
+    return app(event, context)
@@ -0,0 +1,68 @@
+import argparse
+import os
+
+import psycopg2
+
+from avatars import InvalidAvatar, decode_data_uri, store_avatar
+from blobstore import get_blob_store
+
+# Added only after every inline avatar is gone: even a NOT VALID check is enforced
+# on updates of existing rows. NOT VALID + VALIDATE avoids holding an exclusive
+# lock while the table is scanned.
+ADD_REFERENCE_CHECK_SQL = """
+    ALTER TABLE users DROP CONSTRAINT IF EXISTS users_avatar_url_reference;
+    ALTER TABLE users
+        ADD CONSTRAINT users_avatar_url_reference CHECK (length(avatar_url) <= 512) NOT VALID
+"""
+
+
+def migrate(conn, batch_size: int) -> dict:
+    '''
+    Business: Move inline base64 avatars from users into the blob store
+    Args: open connection, users per transaction
+    Returns: counts of moved and cleared (undecodable) avatars; adds the avatar_url length check at the end
+    '''
+    store = get_blob_store()
+    cur = conn.cursor()
+    moved = cleared = 0
+    last_id = 0
+    try:
+        while True:
+            cur.execute(
+                "SELECT id, avatar_url FROM users WHERE id > %s AND avatar_url LIKE 'data:%%' ORDER BY id LIMIT %s",
+                (last_id, batch_size)
+            )
+            rows = cur.fetchall()
+            if not rows:
+                break
+            for user_id, avatar_url in rows:
+                try:
+                    reference = store_avatar(decode_data_uri(avatar_url), store)
+                    moved += 1
+                except InvalidAvatar:
+                    reference = None
+                    cleared += 1
+                cur.execute("UPDATE users SET avatar_url = %s WHERE id = %s", (reference, user_id))
+            conn.commit()
+            last_id = rows[-1][0]
+            print(f'Processed users up to id {last_id}: {moved} moved, {cleared} cleared')
+
+        cur.execute(ADD_REFERENCE_CHECK_SQL)
+        conn.commit()
+        cur.execute("ALTER TABLE users VALIDATE CONSTRAINT users_avatar_url_reference")
+        conn.commit()
+    finally:
+        cur.close()
+    return {'moved': moved, 'cleared': cleared}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Move inline base64 avatars out of users.avatar_url')
+    parser.add_argument('--batch-size', type=int, default=100)
+    args = parser.parse_args()
+
+    connection = psycopg2.connect(os.environ['DATABASE_URL'])
+    try:
+        print(migrate(connection, args.batch_size))
+    finally:
+        connection.close()
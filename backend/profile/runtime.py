@@ -0,0 +1,233 @@
+import hmac
+import json
+import os
+import time
+import traceback
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+import psycopg2
+import psycopg2.errors
+
+from db import PoolExhausted, checkout, get_pool, release
+from instrument import REGISTRY, InstrumentedConnection, Trace
+from response import json_response
+from tokens import AuthError, acting_user, authenticate
+
+CORS_MAX_AGE = '86400'
+# ?__metrics (prometheus text) or ?__metrics=json with X-Metrics-Token; disabled without METRICS_TOKEN
+METRICS_PARAM = '__metrics'
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class InvalidInput(ValueError):
+    '''Base of the parse helpers' errors; the router answers them with 400'''
+
+
+class ConfigError(RuntimeError):
+    '''A setting the route needs is missing or invalid; answered with 503 and the reason'''
+
+
+class Route(NamedTuple):
+    handler: Callable[['Request'], Any]
+    # Public routes also serve requests without a session token when tokens are required
+    public: bool = False
+
+
+class Reply(NamedTuple):
+    '''Route result with a status other than 200 or extra headers'''
+    status: int
+    data: Any
+    headers: Optional[Dict[str, str]] = None
+
+
+def one(cur: Any, message: str = 'Not found') -> tuple:
+    '''The single row of the last query; a missing row becomes a 404 instead of a TypeError'''
+    row = cur.fetchone()
+    if row is None:
+        raise HttpError(404, message)
+    return row
+
+
+class Request:
+    '''
+    Business: One invocation as seen by a route
+    Args: the platform event, verified session claims or None, the invocation's Trace
+    Returns: parsed query/body/headers; conn and cursor are opened on first use and traced
+    '''
+
+    def __init__(self, event: Dict[str, Any], session: Optional[Dict[str, Any]], trace: Trace):
+        self.event = event
+        self.trace = trace
+        self.method = event.get('httpMethod', 'GET')
+        self.params = event.get('queryStringParameters') or {}
+        self.headers = event.get('headers') or {}
+        self.session = session
+        self.body = _parse_body(event.get('body'))
+        self._conn = None
+        self._cur = None
+
+    def header(self, name: str) -> Optional[str]:
+        return _header(self.headers, name)
+
+    def acting_user(self, claimed: Any) -> Any:
+        return acting_user(self.session, claimed)
+
+    @property
+    def conn(self) -> Any:
+        if self._conn is None:
+            started = time.perf_counter()
+            raw = checkout()
+            self.trace.checkout_seconds += time.perf_counter() - started
+            self.trace.connect_seconds += get_pool().last_connect_seconds()
+            self._conn = InstrumentedConnection(raw, self.trace)
+        return self._conn
+
+    @property
+    def cursor(self) -> Any:
+        if self._cur is None:
+            self._cur = self.conn.cursor()
+        return self._cur
+
+    def close(self) -> None:
+        if self._cur is not None:
+            self._cur.close()
+        if self._conn is not None:
+            release(self._conn.raw)
+        self._conn = self._cur = None
+
+
+def _header(headers: Dict[str, Any], name: str) -> Optional[str]:
+    for key, value in headers.items():
+        if key.lower() == name.lower():
+            return value
+    return None
+
+
+def _parse_body(raw: Optional[str]) -> Dict[str, Any]:
+    if not raw:
+        return {}
+    try:
+        body = json.loads(raw)
+    except ValueError:
+        raise HttpError(400, 'Request body must be valid JSON')
+    if not isinstance(body, dict):
+        raise HttpError(400, 'Request body must be a JSON object')
+    return body
+
+
+def _error_status(error: Exception) -> Tuple[int, str]:
+    if isinstance(error, (HttpError, AuthError)):
+        return error.status, str(error)
+    if isinstance(error, InvalidInput):
+        return 400, str(error)
+    if isinstance(error, ConfigError):
+        traceback.print_exc()
+        return 503, f'Service not configured: {error}'
+    if isinstance(error, PoolExhausted):
+        return 503, 'Service busy, try again'
+    if isinstance(error, psycopg2.errors.ForeignKeyViolation):
+        return 404, 'Referenced record not found'
+    if isinstance(error, psycopg2.IntegrityError):
+        return 409, 'Conflicts with existing data'
+    if isinstance(error, psycopg2.DataError):
+        return 400, 'Invalid value'
+    if isinstance(error, psycopg2.OperationalError):
+        traceback.print_exc()
+        return 503, 'Database unavailable'
+    traceback.print_exc()
+    return 500, 'Internal error'
+
+
+class Router:
+    '''
+    Business: Route table of a function: answers preflights, dispatches on method and action, maps errors
+    Args: extra CORS request headers, whether to verify the session token before routing
+    Returns: the router itself is the handler(event, context)
+
+    Routes are registered per method and optional action (query string action
+    for GET, body action otherwise). A token sent to a public route is still
+    verified, it just is not required. Nothing touches the database before the
+    route asks for req.cursor, so preflights and rejected input cost no connection.
+    '''
+
+    def __init__(self, cors_headers: Tuple[str, ...] = ('Content-Type', 'Authorization'), auth: bool = True):
+        self.cors_headers = cors_headers
+        self.auth = auth
+        self.routes: Dict[Tuple[str, Optional[str]], Route] = {}
+
+    def route(self, method: str, action: Optional[str] = None, public: bool = False) -> Callable:
+        def register(fn: Callable[[Request], Any]) -> Callable[[Request], Any]:
+            self.routes[(method, action)] = Route(fn, public)
+            return fn
+        return register
+
+    def methods(self) -> str:
+        return ', '.join(sorted({method for method, _ in self.routes}) + ['OPTIONS'])
+
+    def preflight(self) -> Dict[str, Any]:
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': self.methods(),
+                'Access-Control-Allow-Headers': ', '.join(self.cors_headers),
+                'Access-Control-Max-Age': CORS_MAX_AGE
+            },
+            'body': ''
+        }
+
+    def resolve(self, req: Request) -> Route:
+        if not any(method == req.method for method, _ in self.routes):
+            raise HttpError(405, 'Method not allowed')
+        action = (req.params if req.method == 'GET' else req.body).get('action')
+        req.trace.action = action
+        route = self.routes.get((req.method, action)) or self.routes.get((req.method, None))
+        if route is None:
+            raise HttpError(400, f'Unknown action: {action}' if action else 'action required')
+        return route
+
+    def metrics(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        '''Aggregate counters of this container for a local collector'''
+        token = os.environ.get('METRICS_TOKEN')
+        supplied = _header(event.get('headers') or {}, 'X-Metrics-Token') or ''
+        if not token or not hmac.compare_digest(token, supplied):
+            return json_response(404, {'error': 'Not found'}, event)
+        if (event.get('queryStringParameters') or {}).get(METRICS_PARAM) == 'json':
+            return json_response(200, REGISTRY.snapshot(), event)
+        return {
+            'statusCode': 200,
+            'headers': {'Content-Type': 'text/plain; version=0.0.4'},
+            'body': REGISTRY.prometheus(),
+            'isBase64Encoded': False
+        }
+
+    def __call__(self, event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+        if event.get('httpMethod') == 'OPTIONS':
+            return self.preflight()
+        if METRICS_PARAM in (event.get('queryStringParameters') or {}):
+            return self.metrics(event)
+
+        trace = Trace(event.get('httpMethod', 'GET'), None)
+        req = None
+        try:
+            req = Request(event, None, trace)
+            route = self.resolve(req)
+            if self.auth:
+                req.session = authenticate(event, required=not route.public)
+            result = route.handler(req)
+            if not isinstance(result, Reply):
+                result = Reply(200, result)
+        except Exception as e:
+            status, message = _error_status(e)
+            result = Reply(status, {'error': message})
+        finally:
+            if req is not None:
+                req.close()
+
+        trace.finish(result.status)
+        return json_response(result.status, result.data, event, headers=result.headers)
@@ -0,0 +1,194 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from lookup import escape_like
+from projection import select_users, sideload, user_columns
+from runtime import InvalidInput
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+REPORT_STATUSES = ('pending', 'resolved')
+RESOURCES = ('users', 'reports')
+
+
+class InvalidFilter(InvalidInput):
+    pass
+
+
+def _int(params: Dict[str, Any], name: str) -> Optional[int]:
+    raw = params.get(name)
+    if raw in (None, ''):
+        return None
+    try:
+        value = int(raw)
+    except (TypeError, ValueError):
+        raise InvalidFilter(f'{name} must be an integer')
+    if value < 1:
+        raise InvalidFilter(f'{name} must be positive')
+    return value
+
+
+def _bool(params: Dict[str, Any], name: str) -> Optional[bool]:
+    raw = params.get(name)
+    if raw in (None, ''):
+        return None
+    if raw not in ('true', 'false'):
+        raise InvalidFilter(f'{name} must be true or false')
+    return raw == 'true'
+
+
+def _date(params: Dict[str, Any], name: str) -> Optional[datetime]:
+    raw = params.get(name)
+    if raw in (None, ''):
+        return None
+    try:
+        return datetime.fromisoformat(raw)
+    except (TypeError, ValueError):
+        raise InvalidFilter(f'{name} must be an ISO date')
+
+
+def parse_page(params: Dict[str, Any]) -> Tuple[Optional[int], int]:
+    '''Keyset cursor (last id of the previous page) and clamped page size'''
+    return _int(params, 'cursor'), min(_int(params, 'limit') or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+
+
+def _created_filters(params: Dict[str, Any], alias: str, where: List[str], args: List[Any]) -> None:
+    created_from, created_to = _date(params, 'created_from'), _date(params, 'created_to')
+    if created_from is not None:
+        where.append(f'{alias}.created_at >= %s')
+        args.append(created_from)
+    if created_to is not None:
+        where.append(f'{alias}.created_at < %s')
+        args.append(created_to)
+
+
+def users_filter(params: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    '''
+    Business: WHERE clause of the admin users list
+    Args: queryStringParameters with is_creator, created_from, created_to, email_prefix
+    Returns: SQL condition over alias u and its params
+    '''
+    where, args = ['TRUE'], []
+    is_creator = _bool(params, 'is_creator')
+    if is_creator is not None:
+        where.append('u.is_creator = %s')
+        args.append(is_creator)
+    email_prefix = params.get('email_prefix')
+    if email_prefix:
+        where.append("u.email LIKE %s ESCAPE '\\'")
+        args.append(escape_like(email_prefix) + '%')
+    _created_filters(params, 'u', where, args)
+    return ' AND '.join(where), args
+
+
+def reports_filter(params: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    '''
+    Business: WHERE clause of the admin reports list
+    Args: queryStringParameters with status (pending by default, all for any), created_from, created_to
+    Returns: SQL condition over alias r and its params
+    '''
+    where, args = ['TRUE'], []
+    status = params.get('status') or 'pending'
+    if status != 'all':
+        if status not in REPORT_STATUSES:
+            raise InvalidFilter(f'status must be one of: {", ".join(REPORT_STATUSES)}, all')
+        where.append('r.status = %s')
+        args.append(status)
+    _created_filters(params, 'r', where, args)
+    return ' AND '.join(where), args
+
+
+def _keyset(where: str, args: List[Any], alias: str, cursor: Optional[int], limit: int) -> Tuple[str, List[Any]]:
+    if cursor is not None:
+        where += f' AND {alias}.id < %s'
+        args = args + [cursor]
+    return f'WHERE {where} ORDER BY {alias}.id DESC LIMIT %s', args + [limit + 1]
+
+
+def _next_cursor(rows: List[Dict[str, Any]], has_more: bool) -> Optional[str]:
+    return str(rows[-1]['id']) if has_more and rows else None
+
+
+def list_users(cur: Any, where: str, args: List[Any], cursor: Optional[int], limit: int,
+               fields: Tuple[str, ...]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    '''
+    Business: One page of the admin users list, newest first
+    Args: db cursor, filter from users_filter, page from parse_page, user fields to return
+    Returns: user dicts and the cursor of the next page
+    '''
+    tail, args = _keyset(where, args, 'u', cursor, limit)
+    cur.execute(f'SELECT {user_columns(fields)}, u.created_at FROM users u {tail}', args)
+    rows = cur.fetchall()
+    users = [{
+        'id': u[0],
+        **dict(zip(fields, u[1:-1])),
+        'created_at': u[-1]
+    } for u in rows[:limit]]
+    return users, _next_cursor(users, len(rows) > limit)
+
+
+def list_reports(cur: Any, where: str, args: List[Any], cursor: Optional[int], limit: int, view: str,
+                 fields: Tuple[str, ...]) -> Tuple[List[Dict[str, Any]], Optional[str], Optional[Dict[str, Any]]]:
+    '''
+    Business: One page of the admin reports list, newest first
+    Args: db cursor, filter from reports_filter, page from parse_page, view and user fields
+    Returns: report dicts, the cursor of the next page, side-loaded users for the compact view
+    '''
+    tail, args = _keyset(where, args, 'r', cursor, limit)
+
+    if view == 'compact':
+        cur.execute(f"""
+            SELECT r.id, r.reporter_id, r.reported_user_id, r.reason, r.created_at, r.status
+            FROM reports r
+            {tail}
+        """, args)
+    else:
+        cur.execute(f"""
+            SELECT r.id, r.reporter_id, r.reported_user_id, r.reason, r.created_at, r.status,
+                   u1.user_id as reporter_user_id, u1.email as reporter_email,
+                   u2.user_id as reported_user_id_str, u2.email as reported_email
+            FROM reports r
+            JOIN users u1 ON r.reporter_id = u1.id
+            JOIN users u2 ON r.reported_user_id = u2.id
+            {tail}
+        """, args)
+    rows = cur.fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    reports = [{
+        'id': r[0],
+        'reporter_id': r[1],
+        'reported_user_id': r[2],
+        'reason': r[3],
+        'created_at': r[4],
+        'status': r[5]
+    } for r in rows]
+
+    report_users = None
+    if view == 'compact':
+        people = select_users(cur, [r[1] for r in rows] + [r[2] for r in rows], fields)
+        report_users = sideload(people)
+    else:
+        for report, r in zip(reports, rows):
+            report.update({
+                'reporter_user_id': r[6],
+                'reporter_email': r[7],
+                'reported_user_id_str': r[8],
+                'reported_email': r[9]
+            })
+    return reports, _next_cursor(reports, has_more), report_users
+
+
+def estimate_count(cur: Any, table: str, alias: str, where: str, args: List[Any]) -> int:
+    '''
+    Business: Row count estimate without a full COUNT(*)
+    Args: db cursor, table and alias, filter from users_filter/reports_filter
+    Returns: planner row estimate; pg_class statistics when there is no filter
+    '''
+    if where == 'TRUE':
+        cur.execute('SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = %s::regclass', (table,))
+        row = cur.fetchone()
+        return int(row[0]) if row else 0
+    cur.execute(f'EXPLAIN (FORMAT JSON) SELECT 1 FROM {table} {alias} WHERE {where}', args)
+    return int(cur.fetchone()[0][0]['Plan']['Plan Rows'])
@@ -0,0 +1,125 @@
+import base64
+import os
+import struct
+from typing import Any, Dict, Optional, Tuple
+
+from runtime import InvalidInput
+
+# File layout: header, then COUNT big-endian 8-byte username hashes in ascending
+# order, so a client can binary search the memory-mapped file as it is.
+# hash = first 8 bytes of sha256(normalized username)
+MAGIC = b'SCBL'
+FORMAT_VERSION = 1
+HASH_BYTES = 8
+HEADER = struct.Struct('>4sHHQQ')  # magic, format, hash bytes, version, count
+
+# Beyond this many changed rows a client is sent a fresh snapshot instead
+MAX_DELTA_ROWS = int(os.environ.get('BLOCKLIST_MAX_DELTA_ROWS', '20000'))
+
+USERNAME_HASH = "substr(sha256(convert_to(username_normalized, 'UTF8')), 1, 8)"
+
+# A version is a transaction id below which every change has committed or rolled
+# back: the snapshot xmin, or one past the last change when that is older, so the
+# version only moves when the blocklist does.
+VERSION_SQL = """
+    SELECT LEAST(
+        pg_snapshot_xmin(pg_current_snapshot())::text::bigint,
+        GREATEST(
+            (SELECT MAX(change_xid) FROM scam_reports),
+            (SELECT MAX(change_xid) FROM scam_report_removals),
+            0
+        ) + 1
+    )
+"""
+
+SNAPSHOT_SQL = f"""
+    SELECT {USERNAME_HASH} AS username_hash
+    FROM scam_reports
+    WHERE is_scammer
+    ORDER BY username_hash
+"""
+
+# Every row stamped at or after the client's version: flagged rows are additions,
+# the rest removals, as are usernames deleted or renamed away. A change newer than
+# the returned version may already be in here; it is sent again next time, and
+# applying it twice is harmless.
+DELTA_SQL = f"""
+    SELECT {USERNAME_HASH}, is_scammer
+    FROM scam_reports
+    WHERE change_xid >= %(since)s
+    UNION ALL
+    SELECT {USERNAME_HASH}, FALSE
+    FROM scam_report_removals r
+    WHERE r.change_xid >= %(since)s
+      AND NOT EXISTS (SELECT 1 FROM scam_reports s WHERE s.username_normalized = r.username_normalized)
+    LIMIT %(limit)s
+"""
+
+
+class InvalidVersion(InvalidInput):
+    pass
+
+
+def parse_version(raw: Any) -> Optional[int]:
+    if raw in (None, ''):
+        return None
+    try:
+        version = int(raw)
+    except (TypeError, ValueError):
+        raise InvalidVersion('since must be a blocklist version')
+    if version < 0:
+        raise InvalidVersion('since must be a blocklist version')
+    return version
+
+
+def pack(hashes: list) -> str:
+    return base64.b64encode(b''.join(hashes)).decode()
+
+
+# Last snapshot built by this container; rebuilt only when the version moves
+_snapshot: Tuple[int, Optional[Dict[str, Any]]] = (-1, None)
+
+
+def snapshot(cur: Any, version: int) -> Dict[str, Any]:
+    global _snapshot
+    cached_version, payload = _snapshot
+    if cached_version == version and payload is not None:
+        return payload
+
+    cur.execute(SNAPSHOT_SQL)
+    hashes = [bytes(row[0]) for row in cur.fetchall()]
+    data = HEADER.pack(MAGIC, FORMAT_VERSION, HASH_BYTES, version, len(hashes)) + b''.join(hashes)
+    payload = {
+        'version': version,
+        'count': len(hashes),
+        'snapshot': base64.b64encode(data).decode()
+    }
+    _snapshot = (version, payload)
+    return payload
+
+
+def blocklist_payload(cur: Any, since: Optional[int]) -> Dict[str, Any]:
+    '''
+    Business: Current blocklist as a full snapshot or as the changes since a client's version
+    Args: cursor, version the client already holds (None for a snapshot)
+    Returns: {version, count, snapshot} or {version, since, added, removed} with base64 packed hashes
+    '''
+    cur.execute(VERSION_SQL)
+    version = int(cur.fetchone()[0])
+
+    # Versions never go back, so one ahead of ours was not issued by this feed
+    if since is None or since > version:
+        return snapshot(cur, version)
+    if since == version:
+        return {'version': since, 'since': since, 'added': '', 'removed': ''}
+
+    cur.execute(DELTA_SQL, {'since': since, 'limit': MAX_DELTA_ROWS + 1})
+    rows = cur.fetchall()
+    if len(rows) > MAX_DELTA_ROWS:
+        return snapshot(cur, version)
+    return {
+        'version': version,
+        'since': since,
+        'added': pack(sorted(bytes(h) for h, flagged in rows if flagged)),
+        'removed': pack(sorted(bytes(h) for h, flagged in rows if not flagged))
+    }
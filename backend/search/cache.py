@@ -0,0 +1,76 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+CACHE_MAX_ENTRIES = int(os.environ.get('SEARCH_CACHE_MAX_ENTRIES', '1024'))
+CACHE_TTL_SECONDS = float(os.environ.get('SEARCH_CACHE_TTL_SECONDS', '30'))
+
+
+class LookupCache:
+    '''
+    Business: Bounded LRU cache with TTL for search results of a warm container
+    Args: max_entries - LRU bound, ttl - seconds an entry stays valid
+    Returns: cached values keyed by (normalized username, variant)
+
+    The cache lives in one container, so writes handled by other containers are
+    only picked up after ttl; keep it short.
+    '''
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: 'OrderedDict[Tuple[str, Hashable], Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    def get(self, username: str, variant: Hashable = None) -> Optional[Any]:
+        key = (username, variant)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return value
+
+    def put(self, username: str, variant: Hashable, value: Any) -> None:
+        key = (username, variant)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def invalidate(self, username: str) -> int:
+        '''Drop every cached search whose term could match username'''
+        with self._lock:
+            stale = [key for key in self._entries if key[0] in username]
+            for key in stale:
+                del self._entries[key]
+            self._stats['invalidations'] += len(stale)
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            data = dict(self._stats)
+            data['size'] = len(self._entries)
+        data['max_entries'] = self.max_entries
+        data['ttl_seconds'] = self.ttl
+        return data
+
+
+LOOKUP_CACHE = LookupCache()
@@ -1,241 +1,260 @@
-import json
-import os
-import psycopg2
 from typing import Dict, Any
 
+from admin import (
+    RESOURCES, InvalidFilter, estimate_count, list_reports, list_users, parse_page,
+    reports_filter, users_filter,
+)
+from blocklist import blocklist_payload, parse_version
+from cache import LOOKUP_CACHE
+from db import pool_stats
+from lookup import (
+    BULK_LOOKUP_SQL, InvalidSearch, build_search_query, bulk_verdict, decode_cursor,
+    encode_cursor, normalize_username, parse_limit, parse_min_score, parse_sort, prepare_bulk_page, resolve_mode,
+)
+from projection import parse_projection
+from reports import SUBMIT_REPORT_SQL
+from runtime import HttpError, Reply, Request, Router, one
+from tokens import tokens_required
+from votes import COUNTERS_SQL, RATING_TYPES, VOTE_SQL
+
+app = Router(cors_headers=('Content-Type', 'Authorization', 'X-User-Id'))
+
+
+def is_admin(req: Request) -> bool:
+    if req.session is not None:
+        return bool(req.session.get('admin'))
+    # Legacy admin header, honoured until session tokens are required
+    return not tokens_required() and req.header('X-User-Id') == '1001'
+
+
+def require_admin(req: Request) -> None:
+    if not is_admin(req):
+        raise HttpError(403, 'Admin access required')
+
+
+def require_int(value: Any, name: str) -> int:
+    if isinstance(value, str) and value.isdigit():
+        value = int(value)
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+        raise HttpError(400, f'{name} must be a positive integer')
+    return value
+
+
+@app.route('GET', public=True)
+def get(req: Request) -> Any:
+    if is_admin(req):
+        return admin_panel(req)
+    return search(req)
+
+
+def admin_panel(req: Request) -> Any:
+    # Admin panel: paginated users and reports
+    params = req.params
+    resource = params.get('resource') or None
+
+    # Every parameter is validated before the first query opens a connection
+    view, fields = parse_projection(params)
+    if resource is not None and resource not in RESOURCES:
+        raise InvalidFilter(f'resource must be one of: {", ".join(RESOURCES)}')
+    if resource is None and params.get('cursor'):
+        raise InvalidFilter('cursor requires resource')
+    cursor, limit = parse_page(params)
+    filters = {}
+    if resource in (None, 'users'):
+        filters['users'] = users_filter(params)
+    if resource in (None, 'reports'):
+        filters['reports'] = reports_filter(params)
+
+    cur = req.cursor
+    body = {}
+    estimates = {}
+
+    if 'users' in filters:
+        body['users'], body['users_next_cursor'] = list_users(cur, *filters['users'], cursor, limit, fields)
+        if params.get('count') == 'estimate':
+            estimates['users'] = estimate_count(cur, 'users', 'u', *filters['users'])
+
+    if 'reports' in filters:
+        body['reports'], body['reports_next_cursor'], report_users = list_reports(
+            cur, *filters['reports'], cursor, limit, view, fields
+        )
+        if report_users is not None:
+            body['report_users'] = report_users
+        if params.get('count') == 'estimate':
+            estimates['reports'] = estimate_count(cur, 'reports', 'r', *filters['reports'])
+
+    if estimates:
+        body['estimated_counts'] = estimates
+
+    body['stats'] = {
+        'lookup_cache': LOOKUP_CACHE.stats(),
+        'db_pool': pool_stats()
+    }
+
+    return body
+
+
+def search(req: Request) -> Any:
+    params = req.params
+    username = normalize_username(params.get('username', ''))
+
+    if not username:
+        raise InvalidSearch('Username required')
+
+    mode = resolve_mode(username, params.get('mode'))
+    limit = parse_limit(params.get('limit'))
+    sort = parse_sort(params.get('sort'))
+    min_score = parse_min_score(params.get('min_score'))
+    cursor = decode_cursor(params.get('cursor'), sort)
+
+    cache_variant = (mode, limit, params.get('cursor'), sort, min_score)
+    payload = LOOKUP_CACHE.get(username, cache_variant)
+    if payload is not None:
+        return Reply(200, payload, {'X-Cache': 'HIT'})
+
+    sql, sql_params = build_search_query(username, mode, cursor, limit, sort, min_score)
+    req.cursor.execute(sql, sql_params)
+    results = req.cursor.fetchall()
+
+    next_cursor = None
+    if len(results) > limit:
+        results = results[:limit]
+        last = results[-1]
+        if sort == 'score':
+            next_cursor = encode_cursor(last[8], last[0])
+        else:
+            next_cursor = encode_cursor(last[9], last[10], last[0])
+
+    data = [{
+        'id': r[0],
+        'telegram_username': r[1],
+        'is_scammer': r[2],
+        'report_count': r[3],
+        'description': r[4],
+        'evidence_url': r[5],
+        'likes': r[6],
+        'dislikes': r[7],
+        'score': r[8],
+        'match': ('exact', 'prefix', 'substring')[r[9]]
+    } for r in results]
+
+    payload = {'results': data, 'mode': mode, 'sort': sort, 'next_cursor': next_cursor}
+    LOOKUP_CACHE.put(username, cache_variant, payload)
+
+    return Reply(200, payload, {'X-Cache': 'MISS'})
+
+
+@app.route('GET', 'blocklist', public=True)
+def blocklist(req: Request) -> Any:
+    # Offline check list for bots: snapshot, or changes since the version they hold
+    since = parse_version(req.params.get('since'))
+    payload = blocklist_payload(req.cursor, since)
+    return Reply(200, payload, {'X-Blocklist-Version': str(payload['version'])})
+
+
+@app.route('POST', 'toggle_creator')
+def toggle_creator(req: Request) -> Any:
+    require_admin(req)
+    target_user_id = req.body.get('user_id')
+
+    req.cursor.execute("UPDATE users SET is_creator = NOT is_creator WHERE id = %s RETURNING is_creator", (target_user_id,))
+    new_status = one(req.cursor, 'User not found')[0]
+    req.conn.commit()
+
+    return {'success': True, 'is_creator': new_status}
+
+
+@app.route('POST', 'delete_report')
+def delete_report(req: Request) -> Any:
+    require_admin(req)
+    report_id = req.body.get('report_id')
+
+    req.cursor.execute("UPDATE reports SET status = 'resolved' WHERE id = %s", (report_id,))
+    req.conn.commit()
+
+    return {'success': True}
+
+
+@app.route('POST', 'bulk_lookup', public=True)
+def bulk_lookup(req: Request) -> Any:
+    page, next_offset, total = prepare_bulk_page(req.body.get('usernames'), req.body.get('offset'))
+
+    rows = {}
+    if page:
+        req.cursor.execute(BULK_LOOKUP_SQL, (page,))
+        rows = {r[9]: r for r in req.cursor.fetchall()}
+
+    return {
+        'verdicts': {name: bulk_verdict(rows.get(name)) for name in page},
+        'total': total,
+        'next_offset': next_offset
+    }
+
+
+@app.route('POST')
+def submit_report(req: Request) -> Any:
+    # Regular scam report
+    body = req.body
+    telegram_username = body.get('telegram_username')
+    is_scammer = body.get('is_scammer', False)
+    description = body.get('description', '')
+    evidence_url = body.get('evidence_url', '')
+    reported_by = req.acting_user(body.get('reported_by'))
+
+    if not isinstance(telegram_username, str) or not normalize_username(telegram_username):
+        raise InvalidSearch('Username required')
+
+    if not evidence_url:
+        raise InvalidSearch('Evidence required')
+
+    req.cursor.execute(SUBMIT_REPORT_SQL, {
+        'telegram_username': telegram_username.strip(),
+        'is_scammer': is_scammer,
+        'description': description,
+        'evidence_url': evidence_url,
+        'reported_by': reported_by
+    })
+    report_id, report_count, score = req.cursor.fetchone()
+
+    req.conn.commit()
+    LOOKUP_CACHE.invalidate(normalize_username(telegram_username))
+
+    return {'success': True, 'report_id': report_id, 'report_count': report_count, 'score': score}
+
+
+@app.route('PUT')
+def vote(req: Request) -> Any:
+    report_id = require_int(req.body.get('report_id'), 'report_id')
+    rating_type = req.body.get('rating_type')
+
+    if rating_type not in RATING_TYPES:
+        raise HttpError(400, 'rating_type must be like or dislike')
+
+    user_id = require_int(req.acting_user(req.body.get('user_id')), 'user_id')
+
+    req.cursor.execute(VOTE_SQL, {'report_id': report_id, 'user_id': user_id, 'rating_type': rating_type})
+    result = req.cursor.fetchone()
+    changed = result is not None
+
+    if changed:
+        previous_rating = result[3]
+    else:
+        # Same vote as before, or no such report: then the rating row is rolled back with the 404
+        previous_rating = rating_type
+        req.cursor.execute(COUNTERS_SQL, (report_id,))
+        result = one(req.cursor, 'Report not found')
+
+    req.conn.commit()
+    if changed:
+        LOOKUP_CACHE.invalidate(result[2])
+
+    return {'likes': result[0], 'dislikes': result[1], 'score': result[-1], 'previous_rating': previous_rating}
+
+
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
     Business: Admin panel for user management, reports, and search functionality
-    Args: event with httpMethod, queryStringParameters, body, headers with X-User-Id
+    Args: event with httpMethod, queryStringParameters, body, headers with Authorization: Bearer <token>
     Returns: HTTP response with admin data, search results, and user management
     '''
-    method: str = event.get('httpMethod', 'GET')
-    
-    if method == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, POST, PUT, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id',
-                'Access-Control-Max-Age': '86400'
-            },
-            'body': ''
-        }
-    
-    dsn = os.environ.get('DATABASE_URL')
-    conn = psycopg2.connect(dsn)
-    cur = conn.cursor()
-    
-    try:
-        headers = event.get('headers', {})
-        user_id = headers.get('x-user-id') or headers.get('X-User-Id')
-        
-        if method == 'GET' and user_id == '1001':
-            # Admin panel: get all users and reports
-            cur.execute("""
-                SELECT id, user_id, email, is_creator, avatar_url, created_at
-                FROM users
-                ORDER BY created_at DESC
-            """)
-            users = cur.fetchall()
-            
-            cur.execute("""
-                SELECT r.id, r.reporter_id, r.reported_user_id, r.reason, r.created_at, r.status,
-                       u1.user_id as reporter_user_id, u1.email as reporter_email,
-                       u2.user_id as reported_user_id_str, u2.email as reported_email
-                FROM reports r
-                JOIN users u1 ON r.reporter_id = u1.id
-                JOIN users u2 ON r.reported_user_id = u2.id
-                WHERE r.status = 'pending'
-                ORDER BY r.created_at DESC
-            """)
-            reports = cur.fetchall()
-            
-            return {
-                'statusCode': 200,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({
-                    'users': [{
-                        'id': u[0],
-                        'user_id': u[1],
-                        'email': u[2],
-                        'is_creator': u[3],
-                        'avatar_url': u[4],
-                        'created_at': u[5].isoformat() if u[5] else None
-                    } for u in users],
-                    'reports': [{
-                        'id': r[0],
-                        'reporter_id': r[1],
-                        'reported_user_id': r[2],
-                        'reason': r[3],
-                        'created_at': r[4].isoformat() if r[4] else None,
-                        'status': r[5],
-                        'reporter_user_id': r[6],
-                        'reporter_email': r[7],
-                        'reported_user_id_str': r[8],
-                        'reported_email': r[9]
-                    } for r in reports]
-                }),
-                'isBase64Encoded': False
-            }
-        
-        elif method == 'GET':
-            params = event.get('queryStringParameters', {})
-            username = params.get('username', '')
-            
-            if not username:
-                return {
-                    'statusCode': 400,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Username required'}),
-                    'isBase64Encoded': False
-                }
-            
-            cur.execute(
-                "SELECT id, telegram_username, is_scammer, report_count, description, evidence_url, likes, dislikes FROM scam_reports WHERE telegram_username ILIKE %s",
-                (f'%{username}%',)
-            )
-            results = cur.fetchall()
-            
-            data = [{
-                'id': r[0],
-                'telegram_username': r[1],
-                'is_scammer': r[2],
-                'report_count': r[3],
-                'description': r[4],
-                'evidence_url': r[5],
-                'likes': r[6],
-                'dislikes': r[7]
-            } for r in results]
-            
-            return {
-                'statusCode': 200,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'results': data}),
-                'isBase64Encoded': False
-            }
-        
-        elif method == 'POST':
-            body_data = json.loads(event.get('body', '{}'))
-            action = body_data.get('action')
-            
-            # Admin actions
-            if user_id == '1001' and action in ['toggle_creator', 'delete_report']:
-                if action == 'toggle_creator':
-                    target_user_id = body_data.get('user_id')
-                    cur.execute("UPDATE users SET is_creator = NOT is_creator WHERE id = %s RETURNING is_creator", (target_user_id,))
-                    new_status = cur.fetchone()[0]
-                    conn.commit()
-                    
-                    return {
-                        'statusCode': 200,
-                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                        'body': json.dumps({'success': True, 'is_creator': new_status}),
-                        'isBase64Encoded': False
-                    }
-                
-                elif action == 'delete_report':
-                    report_id = body_data.get('report_id')
-                    cur.execute("UPDATE reports SET status = 'resolved' WHERE id = %s", (report_id,))
-                    conn.commit()
-                    
-                    return {
-                        'statusCode': 200,
-                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                        'body': json.dumps({'success': True}),
-                        'isBase64Encoded': False
-                    }
-            
-            # Regular scam report
-            telegram_username = body_data.get('telegram_username')
-            is_scammer = body_data.get('is_scammer', False)
-            description = body_data.get('description', '')
-            evidence_url = body_data.get('evidence_url', '')
-            reported_by = body_data.get('reported_by')
-            
-            if not evidence_url:
-                return {
-                    'statusCode': 400,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Evidence required'}),
-                    'isBase64Encoded': False
-                }
-            
-            cur.execute(
-                "SELECT id, report_count FROM scam_reports WHERE telegram_username = %s",
-                (telegram_username,)
-            )
-            existing = cur.fetchone()
-            
-            if existing:
-                new_count = existing[1] + 1
-                cur.execute(
-                    "UPDATE scam_reports SET report_count = %s, is_scammer = %s, description = %s, evidence_url = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s",
-                    (new_count, is_scammer, description, evidence_url, existing[0])
-                )
-                report_id = existing[0]
-            else:
-                cur.execute(
-                    "INSERT INTO scam_reports (telegram_username, is_scammer, report_count, description, evidence_url, reported_by) VALUES (%s, %s, %s, %s, %s, %s) RETURNING id",
-                    (telegram_username, is_scammer, 1, description, evidence_url, reported_by)
-                )
-                report_id = cur.fetchone()[0]
-            
-            cur.execute(
-                "INSERT INTO report_evidence (report_id, evidence_url, uploaded_by) VALUES (%s, %s, %s)",
-                (report_id, evidence_url, reported_by)
-            )
-            
-            conn.commit()
-            
-            return {
-                'statusCode': 200,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'success': True}),
-                'isBase64Encoded': False
-            }
-        
-        elif method == 'PUT':
-            body_data = json.loads(event.get('body', '{}'))
-            report_id = body_data.get('report_id')
-            user_id = body_data.get('user_id')
-            rating_type = body_data.get('rating_type')
-            
-            cur.execute(
-                "SELECT id FROM user_ratings WHERE report_id = %s AND user_id = %s",
-                (report_id, user_id)
-            )
-            existing_rating = cur.fetchone()
-            
-            if existing_rating:
-                cur.execute(
-                    "UPDATE user_ratings SET rating_type = %s WHERE id = %s",
-                    (rating_type, existing_rating[0])
-                )
-            else:
-                cur.execute(
-                    "INSERT INTO user_ratings (report_id, user_id, rating_type) VALUES (%s, %s, %s)",
-                    (report_id, user_id, rating_type)
-                )
-            
-            cur.execute(
-                "UPDATE scam_reports SET likes = (SELECT COUNT(*) FROM user_ratings WHERE report_id = %s AND rating_type = 'like'), dislikes = (SELECT COUNT(*) FROM user_ratings WHERE report_id = %s AND rating_type = 'dislike') WHERE id = %s",
-                (report_id, report_id, report_id)
-            )
-            
-            conn.commit()
-            
-            cur.execute("SELECT likes, dislikes FROM scam_reports WHERE id = %s", (report_id,))
-            result = cur.fetchone()
-            
-            return {
-                'statusCode': 200,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'likes': result[0], 'dislikes': result[1]}),
-                'isBase64Encoded': False
-            }
-    
-    finally:
-        cur.close()
-        conn.close()
\ No newline at end of file
+    return app(event, context)
@@ -0,0 +1,185 @@
+from typing import Any, Dict, Optional, Tuple
+
+from runtime import InvalidInput
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MATCH_MODES = ('auto', 'exact', 'prefix', 'substring')
+SORT_ORDERS = ('relevance', 'score')
+
+# Trigram index only helps for terms of at least this many characters
+MIN_SUBSTRING_LENGTH = 3
+
+RESULT_COLUMNS = ('id, telegram_username, is_scammer, report_count, description, evidence_url, likes, dislikes, '
+                  'scam_score')
+
+
+class InvalidSearch(InvalidInput):
+    pass
+
+
+def normalize_username(username: str) -> str:
+    '''Same normalization as the scam_reports.username_normalized column'''
+    return username.strip().lstrip('@').lower()
+
+
+def escape_like(term: str) -> str:
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def resolve_mode(term: str, mode: Optional[str]) -> str:
+    mode = mode or 'auto'
+    if mode not in MATCH_MODES:
+        raise InvalidSearch(f'mode must be one of: {", ".join(MATCH_MODES)}')
+    if mode == 'auto':
+        return 'substring' if len(term) >= MIN_SUBSTRING_LENGTH else 'prefix'
+    return mode
+
+
+def parse_limit(raw: Any) -> int:
+    if raw in (None, ''):
+        return DEFAULT_LIMIT
+    try:
+        limit = int(raw)
+    except (TypeError, ValueError):
+        raise InvalidSearch('limit must be an integer')
+    if limit < 1:
+        raise InvalidSearch('limit must be positive')
+    return min(limit, MAX_LIMIT)
+
+
+def parse_sort(raw: Optional[str]) -> str:
+    sort = raw or 'relevance'
+    if sort not in SORT_ORDERS:
+        raise InvalidSearch(f'sort must be one of: {", ".join(SORT_ORDERS)}')
+    return sort
+
+
+def parse_min_score(raw: Any) -> Optional[int]:
+    if raw in (None, ''):
+        return None
+    try:
+        min_score = int(raw)
+    except (TypeError, ValueError):
+        raise InvalidSearch('min_score must be an integer')
+    if not 0 <= min_score <= 100:
+        raise InvalidSearch('min_score must be between 0 and 100')
+    return min_score
+
+
+def encode_cursor(*parts: int) -> str:
+    return '.'.join(str(part) for part in parts)
+
+
+def decode_cursor(raw: Optional[str], sort: str = 'relevance') -> Optional[Tuple[int, ...]]:
+    '''Relevance cursors are (rank, length, id), score cursors (score, id)'''
+    if not raw:
+        return None
+    try:
+        parts = tuple(int(part) for part in raw.split('.'))
+    except ValueError:
+        raise InvalidSearch('Invalid cursor')
+    if len(parts) != (3 if sort == 'relevance' else 2):
+        raise InvalidSearch('Invalid cursor')
+    return parts
+
+
+def build_search_query(term: str, mode: str, cursor: Optional[Tuple[int, ...]], limit: int,
+                       sort: str = 'relevance', min_score: Optional[int] = None) -> Tuple[str, tuple]:
+    '''
+    Business: Build a ranked, keyset-paginated username search over scam_reports
+    Args: normalized term, resolved mode, decoded cursor, page size, sort order, lowest scam_score to return
+    Returns: SQL and params; rows end with match_rank and match_length for the next cursor
+    '''
+    escaped = escape_like(term)
+    if mode == 'exact':
+        where, where_params = 'username_normalized = %s', (term,)
+    elif mode == 'prefix':
+        where, where_params = "username_normalized LIKE %s ESCAPE '\\'", (escaped + '%',)
+    else:
+        where, where_params = "username_normalized LIKE %s ESCAPE '\\'", ('%' + escaped + '%',)
+    if min_score is not None:
+        where, where_params = where + ' AND scam_score >= %s', where_params + (min_score,)
+
+    if sort == 'score':
+        order = 'scam_score DESC, id DESC'
+        keyset = '(scam_score, id) < (%s, %s)'
+    else:
+        order = 'match_rank, match_length, id'
+        keyset = '(match_rank, match_length, id) > (%s, %s, %s)'
+    after, after_params = ('WHERE ' + keyset, cursor) if cursor else ('', ())
+
+    sql = f"""
+        SELECT {RESULT_COLUMNS}, match_rank, match_length
+        FROM (
+            SELECT {RESULT_COLUMNS},
+                   CASE WHEN username_normalized = %s THEN 0
+                        WHEN username_normalized LIKE %s ESCAPE '\\' THEN 1
+                        ELSE 2 END AS match_rank,
+                   length(username_normalized) AS match_length
+            FROM scam_reports
+            WHERE {where}
+        ) ranked
+        {after}
+        ORDER BY {order}
+        LIMIT %s
+    """
+    params = (term, escaped + '%') + where_params + tuple(after_params) + (limit + 1,)
+    return sql, params
+
+
+BULK_PAGE_SIZE = 500
+MAX_BULK_USERNAMES = 20000
+
+BULK_LOOKUP_SQL = f"""
+    SELECT {RESULT_COLUMNS}, username_normalized
+    FROM scam_reports
+    WHERE username_normalized = ANY(%s)
+"""
+
+
+def prepare_bulk_page(usernames: Any, offset: Any) -> Tuple[list, Optional[int], int]:
+    '''
+    Business: Normalize and dedupe a bulk lookup list and cut out one page of it
+    Args: raw usernames list from the request, offset of the page
+    Returns: page of normalized names, next offset (None on the last page), total distinct names
+    '''
+    if not isinstance(usernames, list) or not usernames:
+        raise InvalidSearch('usernames must be a non-empty list')
+    if len(usernames) > MAX_BULK_USERNAMES:
+        raise InvalidSearch(f'At most {MAX_BULK_USERNAMES} usernames per request')
+    try:
+        offset = int(offset or 0)
+    except (TypeError, ValueError):
+        raise InvalidSearch('offset must be an integer')
+    if offset < 0:
+        raise InvalidSearch('offset must not be negative')
+
+    names = list(dict.fromkeys(
+        normalize_username(name) for name in usernames if isinstance(name, str) and name.strip()
+    ))
+    page = names[offset:offset + BULK_PAGE_SIZE]
+    next_offset = offset + BULK_PAGE_SIZE if offset + BULK_PAGE_SIZE < len(names) else None
+    return page, next_offset, len(names)
+
+
+def verdict(is_scammer: bool, report_count: int) -> str:
+    '''scammer, reported, or safe for vetted entries nobody has reported (e.g. seeded ones)'''
+    if is_scammer:
+        return 'scammer'
+    return 'reported' if report_count else 'safe'
+
+
+def bulk_verdict(row: Optional[tuple]) -> Dict[str, Any]:
+    if row is None:
+        return {'verdict': 'unknown'}
+    return {
+        'verdict': verdict(row[2], row[3]),
+        'id': row[0],
+        'telegram_username': row[1],
+        'is_scammer': row[2],
+        'report_count': row[3],
+        'likes': row[6],
+        'dislikes': row[7],
+        'score': row[8]
+    }
@@ -0,0 +1,36 @@
+# One round trip per submission: record the reporter, upsert the report on its
+# normalized username, bump its counters when it already exists, and attach the
+# evidence row. The reporter row only comes back the first time this reporter
+# reports the username; its primary key serializes concurrent submissions, so
+# distinct_reporters cannot be bumped twice for one reporter.
+# is_scammer follows the majority of submissions instead of the latest one;
+# the scam_reports_score trigger recomputes scam_score from the new counters.
+SUBMIT_REPORT_SQL = """
+    WITH reporter AS (
+        INSERT INTO report_reporters (username_normalized, user_id)
+        SELECT lower(ltrim(btrim(%(telegram_username)s), '@')), %(reported_by)s
+        WHERE %(reported_by)s::int IS NOT NULL
+        ON CONFLICT DO NOTHING
+        RETURNING user_id
+    ),
+    report AS (
+        INSERT INTO scam_reports (telegram_username, is_scammer, report_count, description, evidence_url, reported_by,
+                                  distinct_reporters, evidence_count, scammer_reports, last_reported_at)
+        VALUES (%(telegram_username)s, %(is_scammer)s, 1, %(description)s, %(evidence_url)s, %(reported_by)s,
+                (SELECT COUNT(*) FROM reporter), 1, %(is_scammer)s::int, CURRENT_TIMESTAMP)
+        ON CONFLICT (username_normalized) DO UPDATE SET
+            report_count = scam_reports.report_count + 1,
+            scammer_reports = scam_reports.scammer_reports + EXCLUDED.scammer_reports,
+            is_scammer = 2 * (scam_reports.scammer_reports + EXCLUDED.scammer_reports) >= scam_reports.report_count + 1,
+            distinct_reporters = scam_reports.distinct_reporters + EXCLUDED.distinct_reporters,
+            evidence_count = scam_reports.evidence_count + 1,
+            last_reported_at = CURRENT_TIMESTAMP,
+            description = EXCLUDED.description,
+            evidence_url = EXCLUDED.evidence_url,
+            updated_at = CURRENT_TIMESTAMP
+        RETURNING id, report_count, scam_score
+    )
+    INSERT INTO report_evidence (report_id, evidence_url, uploaded_by)
+    SELECT id, %(evidence_url)s, %(reported_by)s FROM report
+    RETURNING report_id, (SELECT report_count FROM report), (SELECT scam_score FROM report)
+"""
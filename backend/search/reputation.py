@@ -0,0 +1,75 @@
+import argparse
+import os
+from typing import Any, Dict
+
+import psycopg2
+
+# Re-derive the reporter and evidence counters of one id range and rewrite only
+# the rows whose counters drifted or whose score has decayed since it was stored;
+# the scam_reports_score trigger computes the new score on the way in.
+RECOMPUTE_SQL = """
+    UPDATE scam_reports s
+    SET distinct_reporters = c.distinct_reporters,
+        evidence_count = c.evidence_count,
+        last_reported_at = c.last_reported_at
+    FROM (
+        SELECT r.id,
+               (SELECT COUNT(*)::int FROM report_reporters rr
+                WHERE rr.username_normalized = r.username_normalized) AS distinct_reporters,
+               GREATEST(COUNT(e.id)::int, (COALESCE(r.evidence_url, '') <> '')::int) AS evidence_count,
+               COALESCE(MAX(e.created_at), r.last_reported_at, r.updated_at, r.created_at) AS last_reported_at
+        FROM scam_reports r
+        LEFT JOIN report_evidence e ON e.report_id = r.id
+        WHERE r.id > %s AND r.id <= %s
+        GROUP BY r.id
+    ) c
+    WHERE s.id = c.id AND (
+        (s.distinct_reporters, s.evidence_count, s.last_reported_at)
+            IS DISTINCT FROM (c.distinct_reporters, c.evidence_count, c.last_reported_at)
+        OR s.scam_score <> scam_score(
+            s.report_count, c.distinct_reporters, c.evidence_count, s.scammer_reports,
+            s.likes, s.dislikes, c.last_reported_at, CURRENT_TIMESTAMP::timestamp
+        )
+    )
+    RETURNING s.id
+"""
+
+
+def recompute_scores(conn: Any, batch_size: int = 5000, dry_run: bool = False) -> Dict[str, int]:
+    '''
+    Business: Refresh the reporter and evidence counters and scam_score of every scam report
+    Args: open connection, id range per transaction, dry_run rolls every batch back
+    Returns: number of scanned id ranges and of reports that were rewritten
+    '''
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT COALESCE(MAX(id), 0) FROM scam_reports")
+        max_id = cur.fetchone()[0]
+        conn.commit()
+
+        batches = updated = 0
+        for low in range(0, max_id, batch_size):
+            cur.execute(RECOMPUTE_SQL, (low, low + batch_size))
+            updated += len(cur.fetchall())
+            batches += 1
+            if dry_run:
+                conn.rollback()
+            else:
+                conn.commit()
+        return {'batches': batches, 'updated': updated}
+    finally:
+        cur.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Recompute scam_reports reputation scores from report_evidence')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    connection = psycopg2.connect(os.environ['DATABASE_URL'])
+    try:
+        result = recompute_scores(connection, args.batch_size, args.dry_run)
+    finally:
+        connection.close()
+    print(f"{'Would update' if args.dry_run else 'Updated'} {result['updated']} reports in {result['batches']} batches")
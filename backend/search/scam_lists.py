@@ -0,0 +1,393 @@
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from typing import Any, Callable, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+
+import psycopg2
+
+FORMATS = ('csv', 'ndjson')
+IMPORT_COLUMNS = ('telegram_username', 'is_scammer', 'description', 'evidence_url', 'reported_by')
+MAX_USERNAME_LENGTH = 255
+# Rejected lines listed in the summary; the rest are only counted
+MAX_LISTED_ERRORS = 20
+
+TRUE_VALUES = ('true', 't', '1', 'yes', 'y')
+FALSE_VALUES = ('false', 'f', '0', 'no', 'n', '')
+
+# Session-private staging table; the normalized username uses the same
+# expression as the scam_reports.username_normalized column
+CREATE_STAGING_SQL = """
+    CREATE TEMP TABLE scam_import (
+        line_no INTEGER NOT NULL,
+        source_line INTEGER NOT NULL,
+        telegram_username TEXT NOT NULL,
+        username_normalized TEXT GENERATED ALWAYS AS (lower(ltrim(btrim(telegram_username), '@'))) STORED,
+        is_scammer BOOLEAN NOT NULL,
+        description TEXT,
+        evidence_url TEXT,
+        reported_by INTEGER
+    )
+"""
+
+COPY_STAGING_SQL = f"COPY scam_import (line_no, source_line, {', '.join(IMPORT_COLUMNS)}) FROM STDIN"
+
+# Unknown reporters would fail a whole merge batch on the foreign key
+REJECT_UNKNOWN_REPORTERS_SQL = """
+    DELETE FROM scam_import s
+    WHERE s.reported_by IS NOT NULL AND NOT EXISTS (SELECT 1 FROM users u WHERE u.id = s.reported_by)
+    RETURNING s.source_line
+"""
+
+# One statement per batch of staged lines: collapse them to one row per username,
+# record first-time reporters, upsert every username once (ON CONFLICT may touch a
+# row only once per statement) with counters bumped by the whole group, then
+# attach one evidence row per line that carries evidence. Same counter rules as a
+# single submission in reports.py; the last line of a group wins description and
+# evidence_url like repeated submits.
+MERGE_BATCH_SQL = """
+    WITH batch AS (
+        SELECT * FROM scam_import WHERE line_no > %(low)s AND line_no <= %(high)s
+    ),
+    reporters AS (
+        INSERT INTO report_reporters (username_normalized, user_id)
+        SELECT DISTINCT username_normalized, reported_by FROM batch WHERE reported_by IS NOT NULL
+        ON CONFLICT DO NOTHING
+        RETURNING username_normalized
+    ),
+    grouped AS (
+        SELECT b.username_normalized,
+               (array_agg(b.telegram_username ORDER BY b.line_no))[1] AS telegram_username,
+               (array_agg(b.reported_by ORDER BY b.line_no))[1] AS reported_by,
+               (array_agg(b.description ORDER BY b.line_no DESC))[1] AS description,
+               (array_agg(b.evidence_url ORDER BY b.line_no DESC))[1] AS evidence_url,
+               COUNT(*)::int AS reports,
+               (COUNT(*) FILTER (WHERE b.is_scammer))::int AS scammer_reports,
+               (COUNT(*) FILTER (WHERE COALESCE(b.evidence_url, '') <> ''))::int AS evidence,
+               COALESCE(MAX(n.reporters), 0)::int AS new_reporters
+        FROM batch b
+        LEFT JOIN (
+            SELECT username_normalized, COUNT(*) AS reporters FROM reporters GROUP BY username_normalized
+        ) n ON n.username_normalized = b.username_normalized
+        GROUP BY b.username_normalized
+    ),
+    merged AS (
+        INSERT INTO scam_reports (telegram_username, is_scammer, report_count, description, evidence_url, reported_by,
+                                  distinct_reporters, evidence_count, scammer_reports, last_reported_at)
+        SELECT telegram_username, 2 * scammer_reports >= reports, reports, description, evidence_url, reported_by,
+               new_reporters, evidence, scammer_reports, CURRENT_TIMESTAMP
+        FROM grouped
+        ORDER BY username_normalized
+        ON CONFLICT (username_normalized) DO UPDATE SET
+            report_count = scam_reports.report_count + EXCLUDED.report_count,
+            scammer_reports = scam_reports.scammer_reports + EXCLUDED.scammer_reports,
+            is_scammer = 2 * (scam_reports.scammer_reports + EXCLUDED.scammer_reports)
+                         >= scam_reports.report_count + EXCLUDED.report_count,
+            distinct_reporters = scam_reports.distinct_reporters + EXCLUDED.distinct_reporters,
+            evidence_count = scam_reports.evidence_count + EXCLUDED.evidence_count,
+            last_reported_at = CURRENT_TIMESTAMP,
+            description = COALESCE(EXCLUDED.description, scam_reports.description),
+            evidence_url = COALESCE(NULLIF(EXCLUDED.evidence_url, ''), scam_reports.evidence_url),
+            updated_at = CURRENT_TIMESTAMP
+        RETURNING id, username_normalized, xmax = 0 AS inserted
+    ),
+    evidence AS (
+        INSERT INTO report_evidence (report_id, evidence_url, uploaded_by)
+        SELECT m.id, b.evidence_url, b.reported_by
+        FROM batch b
+        JOIN merged m ON m.username_normalized = b.username_normalized
+        WHERE COALESCE(b.evidence_url, '') <> ''
+        RETURNING 1
+    )
+    SELECT (SELECT COUNT(*) FROM batch),
+           COUNT(*) FILTER (WHERE inserted),
+           COUNT(*) FILTER (WHERE NOT inserted),
+           (SELECT COUNT(*) FROM evidence)
+    FROM merged
+"""
+
+EXPORT_COLUMNS = (
+    'telegram_username', 'username_normalized', 'is_scammer', 'report_count', 'distinct_reporters',
+    'evidence_count', 'scam_score', 'likes', 'dislikes', 'description', 'evidence_url', 'updated_at'
+)
+
+
+class InvalidRow(ValueError):
+    pass
+
+
+def parse_flag(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    if value is None:
+        return False
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise InvalidRow('is_scammer must be a boolean')
+
+
+def parse_row(record: Dict[str, Any], default_reporter: Optional[int]) -> Tuple[Any, ...]:
+    '''
+    Business: Validate one imported record the way a POST submission is validated
+    Args: record keyed by IMPORT_COLUMNS (extra keys ignored), reporter for records without one
+    Returns: values in IMPORT_COLUMNS order, ready for the staging table
+    '''
+    username = record.get('telegram_username')
+    if not isinstance(username, str) or not username.strip().lstrip('@').strip():
+        raise InvalidRow('telegram_username required')
+    username = username.strip()
+    if len(username) > MAX_USERNAME_LENGTH:
+        raise InvalidRow(f'telegram_username longer than {MAX_USERNAME_LENGTH} characters')
+
+    reported_by = record.get('reported_by')
+    if reported_by in (None, ''):
+        reported_by = default_reporter
+    else:
+        try:
+            reported_by = int(reported_by)
+        except (TypeError, ValueError):
+            raise InvalidRow('reported_by must be an integer')
+
+    description = record.get('description')
+    evidence_url = record.get('evidence_url')
+    return (
+        username,
+        parse_flag(record.get('is_scammer')),
+        None if description in (None, '') else str(description),
+        None if evidence_url in (None, '') else str(evidence_url).strip(),
+        reported_by
+    )
+
+
+def read_records(stream: IO[str], fmt: str) -> Iterator[Tuple[int, Any]]:
+    '''Lazily yield (line number, record) from a CSV file with a header row or from NDJSON'''
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_no, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield line_no, record if isinstance(record, dict) else InvalidRow('not a JSON object')
+
+
+def copy_field(value: Any) -> str:
+    '''One column in COPY text format'''
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+class CopyStream:
+    '''
+    Business: File-like source for COPY FROM STDIN fed by a row generator
+    Args: iterable of staged rows, progress callback, rows between progress calls
+    Returns: read(size) chunks; only one chunk of rows is ever held in memory
+    '''
+
+    def __init__(self, rows: Iterable[Tuple[Any, ...]], progress: Callable[[Dict[str, Any]], None],
+                 progress_every: int):
+        self._rows = iter(rows)
+        self._buffer = b''
+        self._progress = progress
+        self._progress_every = progress_every
+        self.rows = 0
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self._buffer += ('\t'.join(copy_field(v) for v in row) + '\n').encode()
+            self.rows += 1
+            if self.rows % self._progress_every == 0:
+                self._progress({'phase': 'copy', 'rows': self.rows})
+        if size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+
+def import_list(conn: Any, stream: IO[str], fmt: str = 'csv', default_reporter: Optional[int] = None,
+                batch_size: int = 5000, dry_run: bool = False,
+                progress: Callable[[Dict[str, Any]], None] = lambda event: None,
+                progress_every: int = 10000) -> Dict[str, Any]:
+    '''
+    Business: Merge a partner scam list into scam_reports and report_evidence
+    Args: open connection, text stream, csv/ndjson, reporter for rows without one, staged lines per
+          merge transaction, dry_run rolls every merge back, progress callback and its interval
+    Returns: counts of read, rejected and merged lines, created and updated reports, evidence rows, first errors
+    '''
+    if fmt not in FORMATS:
+        raise ValueError(f'format must be one of: {", ".join(FORMATS)}')
+
+    errors: List[Dict[str, Any]] = []
+    rejected = 0
+
+    def staged_rows() -> Iterator[Tuple[Any, ...]]:
+        nonlocal rejected
+        staged = 0
+        for line_no, record in read_records(stream, fmt):
+            try:
+                if isinstance(record, InvalidRow):
+                    raise record
+                row = parse_row(record, default_reporter)
+            except InvalidRow as e:
+                rejected += 1
+                if len(errors) < MAX_LISTED_ERRORS:
+                    errors.append({'line': line_no, 'error': str(e)})
+                continue
+            staged += 1
+            # Consecutive staging numbers keep merge batches evenly sized
+            yield (staged, line_no) + row
+
+    cur = conn.cursor()
+    try:
+        cur.execute(CREATE_STAGING_SQL)
+        source = CopyStream(staged_rows(), progress, progress_every)
+        cur.copy_expert(COPY_STAGING_SQL, source)
+        copied = source.rows
+        cur.execute(REJECT_UNKNOWN_REPORTERS_SQL)
+        for (line_no,) in cur.fetchall():
+            rejected += 1
+            if len(errors) < MAX_LISTED_ERRORS:
+                errors.append({'line': line_no, 'error': 'reported_by is not a known user'})
+        # Temp tables are never analyzed automatically
+        cur.execute('ANALYZE scam_import')
+        conn.commit()
+        progress({'phase': 'copy', 'rows': copied, 'rejected': rejected, 'done': True})
+
+        totals = {'created': 0, 'updated': 0, 'evidence': 0, 'merged': 0}
+        for low in range(0, copied, batch_size):
+            cur.execute(MERGE_BATCH_SQL, {'low': low, 'high': low + batch_size})
+            lines, created, updated, evidence = cur.fetchone()
+            if dry_run:
+                conn.rollback()
+            else:
+                conn.commit()
+            totals['merged'] += lines
+            totals['created'] += created
+            totals['updated'] += updated
+            totals['evidence'] += evidence
+            progress(dict(totals, phase='merge', rows=min(low + batch_size, copied), of=copied))
+
+        cur.execute('DROP TABLE scam_import')
+        conn.commit()
+        return dict(totals, read=totals['merged'] + rejected, rejected=rejected, errors=errors)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def export_query(fmt: str, scammers_only: bool = False, min_score: Optional[int] = None,
+                 since: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+    '''
+    Business: Build the SELECT behind an export
+    Args: csv/ndjson, only is_scammer rows, lowest scam_score, only rows updated after this timestamp
+    Returns: SQL and params; ndjson rows are one JSON text column
+    '''
+    conditions, params = [], {}
+    if scammers_only:
+        conditions.append('is_scammer')
+    if min_score is not None:
+        conditions.append('scam_score >= %(min_score)s')
+        params['min_score'] = min_score
+    if since:
+        conditions.append('updated_at > %(since)s')
+        params['since'] = since
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+    sql = f"SELECT {', '.join(EXPORT_COLUMNS)} FROM scam_reports {where} ORDER BY id"
+    if fmt == 'ndjson':
+        sql = f'SELECT row_to_json(r)::text FROM ({sql}) r'
+    return sql, params
+
+
+def export_list(conn: Any, out: IO[bytes], fmt: str = 'csv', **filters: Any) -> None:
+    '''
+    Business: Stream scam_reports to a binary file without holding the result in memory
+    Args: open connection, binary output, csv/ndjson, export_query filters
+    Returns: nothing; COPY TO STDOUT writes rows to out as the server sends them
+    '''
+    if fmt not in FORMATS:
+        raise ValueError(f'format must be one of: {", ".join(FORMATS)}')
+    sql, params = export_query(fmt, **filters)
+    cur = conn.cursor()
+    try:
+        query = cur.mogrify(sql, params).decode()
+        if fmt == 'csv':
+            copy = f'COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)'
+        else:
+            # CSV with quote and delimiter characters that JSON never leaves
+            # unescaped prints each document verbatim, one per line
+            copy = f"COPY ({query}) TO STDOUT WITH (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')"
+        cur.copy_expert(copy, out)
+        conn.commit()
+    finally:
+        cur.close()
+
+
+def report_progress(event: Dict[str, Any]) -> None:
+    sys.stderr.write(json.dumps(event) + '\n')
+    sys.stderr.flush()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Bulk import and export of scam lists through COPY')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    load = commands.add_parser('import', help='merge a CSV (with header) or NDJSON list into scam_reports')
+    load.add_argument('path', help='file to read, - for stdin')
+    load.add_argument('--format', choices=FORMATS, default='csv')
+    load.add_argument('--reported-by', type=int, help='users.id recorded for rows without reported_by')
+    load.add_argument('--batch-size', type=int, default=5000)
+    load.add_argument('--progress-every', type=int, default=10000)
+    load.add_argument('--dry-run', action='store_true')
+
+    dump = commands.add_parser('export', help='stream scam_reports as CSV or NDJSON')
+    dump.add_argument('path', nargs='?', default='-', help='file to write, - for stdout')
+    dump.add_argument('--format', choices=FORMATS, default='csv')
+    dump.add_argument('--scammers-only', action='store_true')
+    dump.add_argument('--min-score', type=int)
+    dump.add_argument('--since', help='only reports updated after this timestamp')
+    args = parser.parse_args()
+
+    connection = psycopg2.connect(os.environ['DATABASE_URL'])
+    try:
+        if args.command == 'import':
+            stream = (io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8-sig', newline='') if args.path == '-'
+                      else open(args.path, encoding='utf-8-sig', newline=''))
+            with stream:
+                result = import_list(connection, stream, args.format, args.reported_by, args.batch_size,
+                                     args.dry_run, report_progress, args.progress_every)
+            print(json.dumps(dict(result, dry_run=args.dry_run), ensure_ascii=False))
+        else:
+            out = sys.stdout.buffer if args.path == '-' else open(args.path, 'wb')
+            try:
+                export_list(connection, out, args.format, scammers_only=args.scammers_only,
+                            min_score=args.min_score, since=args.since)
+            finally:
+                if out is not sys.stdout.buffer:
+                    out.close()
+    finally:
+        connection.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+import argparse
+import os
+from typing import Any, Dict
+
+import psycopg2
+
+RATING_TYPES = ('like', 'dislike')
+
+# One round trip per vote: upsert the voter's rating and shift the report
+# counters by the difference. xmax is 0 only for a freshly inserted row; an
+# updated row always held the other rating type because re-voting the same way
+# is filtered out by the conflict WHERE and returns no row at all.
+VOTE_SQL = """
+    WITH vote AS (
+        INSERT INTO user_ratings (report_id, user_id, rating_type)
+        VALUES (%(report_id)s, %(user_id)s, %(rating_type)s)
+        ON CONFLICT (report_id, user_id) DO UPDATE SET rating_type = EXCLUDED.rating_type
+        WHERE user_ratings.rating_type IS DISTINCT FROM EXCLUDED.rating_type
+        RETURNING rating_type,
+                  CASE WHEN xmax = 0 THEN NULL
+                       WHEN rating_type = 'like' THEN 'dislike'
+                       ELSE 'like' END AS previous_rating
+    )
+    UPDATE scam_reports s
+    SET likes = s.likes
+            + (CASE WHEN v.rating_type = 'like' THEN 1 ELSE 0 END)
+            - (CASE WHEN v.previous_rating = 'like' THEN 1 ELSE 0 END),
+        dislikes = s.dislikes
+            + (CASE WHEN v.rating_type = 'dislike' THEN 1 ELSE 0 END)
+            - (CASE WHEN v.previous_rating = 'dislike' THEN 1 ELSE 0 END)
+    FROM vote v
+    WHERE s.id = %(report_id)s
+    RETURNING s.likes, s.dislikes, s.username_normalized, v.previous_rating, s.scam_score
+"""
+
+COUNTERS_SQL = "SELECT likes, dislikes, username_normalized, scam_score FROM scam_reports WHERE id = %s"
+
+RECONCILE_SQL = """
+    UPDATE scam_reports s
+    SET likes = c.likes, dislikes = c.dislikes
+    FROM (
+        SELECT r.id,
+               COUNT(ur.id) FILTER (WHERE ur.rating_type = 'like') AS likes,
+               COUNT(ur.id) FILTER (WHERE ur.rating_type = 'dislike') AS dislikes
+        FROM scam_reports r
+        LEFT JOIN user_ratings ur ON ur.report_id = r.id
+        WHERE r.id > %s AND r.id <= %s
+        GROUP BY r.id
+    ) c
+    WHERE s.id = c.id AND (s.likes, s.dislikes) IS DISTINCT FROM (c.likes, c.dislikes)
+    RETURNING s.id
+"""
+
+
+def reconcile_counters(conn: Any, batch_size: int = 5000, dry_run: bool = False) -> Dict[str, int]:
+    '''
+    Business: Re-derive likes/dislikes of every scam report from user_ratings
+    Args: open connection, id range per transaction, dry_run rolls every batch back
+    Returns: number of scanned id ranges and of reports whose counters drifted
+    '''
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT COALESCE(MAX(id), 0) FROM scam_reports")
+        max_id = cur.fetchone()[0]
+        conn.commit()
+
+        batches = fixed = 0
+        for low in range(0, max_id, batch_size):
+            cur.execute(RECONCILE_SQL, (low, low + batch_size))
+            fixed += len(cur.fetchall())
+            batches += 1
+            if dry_run:
+                conn.rollback()
+            else:
+                conn.commit()
+        return {'batches': batches, 'fixed': fixed}
+    finally:
+        cur.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Recompute scam_reports like/dislike counters from user_ratings')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    connection = psycopg2.connect(os.environ['DATABASE_URL'])
+    try:
+        result = reconcile_counters(connection, args.batch_size, args.dry_run)
+    finally:
+        connection.close()
+    print(f"{'Would fix' if args.dry_run else 'Fixed'} {result['fixed']} reports in {result['batches']} batches")
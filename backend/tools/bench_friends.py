@@ -0,0 +1,126 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Any, Dict, List
+
+import psycopg2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'friends'))
+
+from edges import build_friends_query  # noqa: E402
+
+SCHEMA = 'bench_friends'
+PAGE_SIZE = 100
+
+# The OR-join the friends GET used before the UNION ALL rewrite, cut to the same
+# page (limit + 1 rows, newest friendship first) so both return the same rows
+OR_JOIN_SQL = """
+    SELECT u.id, u.user_id, u.email, u.is_creator, u.avatar_url, f.status, f.id
+    FROM friendships f
+    JOIN users u ON (f.friend_id = u.id OR f.user_id = u.id)
+    WHERE (f.user_id = %(user_id)s OR f.friend_id = %(user_id)s) AND u.id != %(user_id)s
+    ORDER BY f.id DESC
+    LIMIT %(fetch)s
+"""
+
+
+def seed(cur: Any, users: int, edges: int) -> None:
+    cur.execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE')
+    cur.execute(f'CREATE SCHEMA {SCHEMA}')
+    # Copies columns, constraints and indexes from the migrated tables
+    cur.execute(f'CREATE TABLE {SCHEMA}.users (LIKE users INCLUDING ALL)')
+    cur.execute(f'CREATE TABLE {SCHEMA}.friendships (LIKE friendships INCLUDING ALL)')
+    cur.execute(f'SET search_path TO {SCHEMA}')
+    cur.execute("""
+        INSERT INTO users (id, user_id, email, password_hash)
+        SELECT g, '#b' || g, 'bench' || g || '@example.com', 'x'
+        FROM generate_series(1, %s) g
+    """, (users,))
+    # Skewed degrees: low ids get most of the edges, like real popular accounts
+    cur.execute("""
+        INSERT INTO friendships (id, user_id, friend_id, status)
+        SELECT g,
+               1 + floor(power(random(), 3) * %(users)s)::int,
+               1 + floor(random() * %(users)s)::int,
+               (ARRAY['pending', 'accepted', 'accepted', 'rejected'])[1 + floor(random() * 4)::int]
+        FROM generate_series(1, %(edges)s) g
+        ON CONFLICT DO NOTHING
+    """, {'users': users, 'edges': edges})
+    cur.execute('ANALYZE users')
+    cur.execute('ANALYZE friendships')
+
+
+def time_query(cur: Any, sql: str, params: Dict[str, Any], repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        cur.execute(sql, params)
+        cur.fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def summary(timings: List[float]) -> Dict[str, float]:
+    ordered = sorted(timings)
+    return {
+        'p50_ms': round(statistics.median(ordered), 3),
+        'p95_ms': round(ordered[int(len(ordered) * 0.95) - 1], 3),
+        'max_ms': round(ordered[-1], 3)
+    }
+
+
+def main() -> int:
+    '''
+    Business: Compare the old OR-join friends query with the UNION ALL rewrite on a seeded graph
+    Args: --users, --edges graph size, --samples users to query, --repeat runs per user, --keep keeps the schema
+    Returns: exit code 0; prints latency summaries as JSON
+    '''
+    parser = argparse.ArgumentParser(description='Benchmark friends listing on a seeded graph in a scratch schema')
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--edges', type=int, default=1000000)
+    parser.add_argument('--samples', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--keep', action='store_true', help=f'keep the {SCHEMA} schema afterwards')
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(os.environ['DATABASE_URL'])
+    cur = conn.cursor()
+    try:
+        seed(cur, args.users, args.edges)
+        conn.commit()
+
+        # Popular and ordinary users alike
+        sample = random.sample(range(1, args.users + 1), args.samples - args.samples // 5)
+        sample += list(range(1, args.samples // 5 + 1))
+
+        results = {'or_join': [], 'union_all': [], 'union_all_accepted': []}
+        for user_id in sample:
+            sql, params = build_friends_query(user_id, None, None, PAGE_SIZE)
+            results['or_join'] += time_query(cur, OR_JOIN_SQL, params, args.repeat)
+            results['union_all'] += time_query(cur, sql, params, args.repeat)
+            sql, params = build_friends_query(user_id, 'accepted', None, PAGE_SIZE)
+            results['union_all_accepted'] += time_query(cur, sql, params, args.repeat)
+
+        cur.execute('SELECT COUNT(*) FROM friendships')
+        print(json.dumps({
+            'users': args.users,
+            'edges': cur.fetchone()[0],
+            'sampled_users': len(sample),
+            'queries': {name: summary(timings) for name, timings in results.items()}
+        }, indent=2))
+    finally:
+        conn.rollback()
+        if not args.keep:
+            cur.execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE')
+            conn.commit()
+        cur.close()
+        conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
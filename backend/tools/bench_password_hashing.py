@@ -0,0 +1,60 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'auth'))
+
+from passwords import LegacySha256Hasher, ScryptHasher  # noqa: E402
+
+# (n, r, p) settings to compare; PASSWORD_SCRYPT_N/R/P pick one in production
+COST_SETTINGS = [(2 ** 13, 8, 1), (2 ** 14, 8, 1), (2 ** 15, 8, 1), (2 ** 16, 8, 1), (2 ** 14, 8, 2)]
+
+
+def logins_per_second(verify, seconds: float) -> float:
+    count = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        verify()
+        count += 1
+    return count / (time.perf_counter() - started)
+
+
+def main() -> int:
+    '''
+    Business: Measure password verifications per second on one core for each cost setting
+    Args: --seconds to run each setting
+    Returns: exit code 0; prints a JSON table of logins/sec/core and memory per verification
+    '''
+    parser = argparse.ArgumentParser(description='Benchmark login verification throughput per core')
+    parser.add_argument('--seconds', type=float, default=3.0)
+    args = parser.parse_args()
+
+    password = 'correct horse battery staple'
+    results = []
+
+    legacy = LegacySha256Hasher()
+    legacy_hash = hashlib.sha256(password.encode()).hexdigest()
+    results.append({
+        'scheme': 'sha256 (legacy)',
+        'logins_per_second_per_core': round(logins_per_second(lambda: legacy.verify(password, legacy_hash), args.seconds)),
+        'memory_mib': 0
+    })
+
+    for n, r, p in COST_SETTINGS:
+        hasher = ScryptHasher(n, r, p)
+        encoded = hasher.hash(password)
+        results.append({
+            'scheme': f'scrypt n={n} r={r} p={p}',
+            'logins_per_second_per_core': round(logins_per_second(lambda: hasher.verify(password, encoded), args.seconds), 1),
+            'memory_mib': round(128 * n * r / 2 ** 20, 1)
+        })
+
+    print(json.dumps({'cpu_count': os.cpu_count(), 'results': results}, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
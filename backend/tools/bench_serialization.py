@@ -0,0 +1,95 @@
+import argparse
+import datetime
+import json
+import os
+import sys
+import timeit
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'chat'))
+
+from response import json_response, orjson  # noqa: E402
+
+COLUMNS = ('id', 'sender_id', 'text', 'created_at', 'sender_email', 'sender_avatar')
+
+
+class FakeCursor:
+    def __init__(self, rows: List[tuple]):
+        self.rows = rows
+        self.description = [(name,) for name in COLUMNS]
+
+    def fetchall(self) -> List[tuple]:
+        return self.rows
+
+
+def make_rows(count: int) -> List[tuple]:
+    started = datetime.datetime(2024, 1, 1, 12, 0, 0)
+    return [(
+        i,
+        i % 2 + 1,
+        f'Message number {i} with some ordinary chat text in it',
+        started + datetime.timedelta(seconds=i, microseconds=i),
+        f'user{i % 2 + 1}@example.com',
+        f'https://cdn.example.com/avatars/{i % 2:064d}/256.jpg'
+    ) for i in range(count)]
+
+
+def legacy_path(rows: List[tuple]) -> Dict[str, Any]:
+    # What every handler did before response.py: index-mapped dicts, isoformat, stdlib json
+    data = [{
+        'id': m[0],
+        'sender_id': m[1],
+        'text': m[2],
+        'created_at': m[3].isoformat(),
+        'sender_email': m[4],
+        'sender_avatar': m[5]
+    } for m in rows]
+    return {
+        'statusCode': 200,
+        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+        'body': json.dumps({'messages': data}),
+        'isBase64Encoded': False
+    }
+
+
+def response_path(rows: List[tuple], accept_encoding: str) -> Dict[str, Any]:
+    cur = FakeCursor(rows)
+    names = [column[0] for column in cur.description]
+    data = [dict(zip(names, row)) for row in cur.fetchall()]
+    return json_response(200, {'messages': data}, {'headers': {'Accept-Encoding': accept_encoding}})
+
+
+def main() -> int:
+    '''
+    Business: Micro-benchmark of response serialization, legacy json.dumps path vs response.py
+    Args: --rows per response, --number of repetitions
+    Returns: exit code 0; prints milliseconds per response and body sizes
+    '''
+    parser = argparse.ArgumentParser(description='Compare response serialization paths on chat-message-like rows')
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--number', type=int, default=50)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    cases = {
+        'legacy_json_dumps': lambda: legacy_path(rows),
+        'response_identity': lambda: response_path(rows, ''),
+        'response_gzip': lambda: response_path(rows, 'gzip'),
+        'response_br': lambda: response_path(rows, 'br, gzip'),
+    }
+
+    report = {'rows': args.rows, 'orjson': orjson is not None, 'cases': {}}
+    for name, case in cases.items():
+        seconds = min(timeit.repeat(case, number=args.number, repeat=3)) / args.number
+        response = case()
+        report['cases'][name] = {
+            'ms_per_response': round(seconds * 1000, 3),
+            'body_bytes': len(response['body']),
+            'encoding': response['headers'].get('Content-Encoding', 'identity')
+        }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,157 @@
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import urllib.parse
+import urllib.request
+from typing import Any, Dict, Iterable, Optional
+
+# Must match backend/search/blocklist.py
+MAGIC = b'SCBL'
+FORMAT_VERSION = 1
+HASH_BYTES = 8
+HEADER = struct.Struct('>4sHHQQ')
+
+
+def username_hash(username: str) -> bytes:
+    '''Same normalization as scam_reports.username_normalized, then the published hash'''
+    normalized = username.strip().lstrip('@').lower()
+    return hashlib.sha256(normalized.encode()).digest()[:HASH_BYTES]
+
+
+class Blocklist:
+    '''
+    Business: In-process membership test against a published blocklist file
+    Args: path of a snapshot file as written by sync()
+    Returns: `username in blocklist` by binary search over the memory-mapped hashes
+
+    The file is replaced atomically on sync, so an open Blocklist keeps reading
+    its own version until the caller swaps in the new one.
+    '''
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b''
+        if len(self._map) < HEADER.size:
+            raise ValueError(f'{path}: not a blocklist file')
+        magic, fmt, width, self.version, self.count = HEADER.unpack_from(self._map)
+        if magic != MAGIC or fmt != FORMAT_VERSION or width != HASH_BYTES:
+            raise ValueError(f'{path}: unsupported blocklist format')
+        if len(self._map) != HEADER.size + self.count * HASH_BYTES:
+            raise ValueError(f'{path}: truncated blocklist')
+
+    def _hash_at(self, index: int) -> bytes:
+        start = HEADER.size + index * HASH_BYTES
+        return self._map[start:start + HASH_BYTES]
+
+    def contains_hash(self, key: bytes) -> bool:
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            if self._hash_at(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+        return low < self.count and self._hash_at(low) == key
+
+    def __contains__(self, username: str) -> bool:
+        return self.contains_hash(username_hash(username))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def hashes(self) -> Iterable[bytes]:
+        return (self._hash_at(i) for i in range(self.count))
+
+    def close(self) -> None:
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+
+
+def _split(packed: str) -> set:
+    raw = base64.b64decode(packed)
+    return {raw[i:i + HASH_BYTES] for i in range(0, len(raw), HASH_BYTES)}
+
+
+def _write(path: str, data: bytes) -> None:
+    '''Write next to the target and rename, so readers never see a partial file'''
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.blocklist-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def apply_delta(current: Optional[Blocklist], payload: Dict[str, Any]) -> bytes:
+    '''New snapshot file contents: the current hashes with a delta payload applied'''
+    hashes = set(current.hashes()) if current is not None else set()
+    hashes = sorted((hashes - _split(payload['removed'])) | _split(payload['added']))
+    return HEADER.pack(MAGIC, FORMAT_VERSION, HASH_BYTES, payload['version'], len(hashes)) + b''.join(hashes)
+
+
+def fetch(url: str, since: Optional[int] = None, timeout: float = 30) -> Dict[str, Any]:
+    query = {'action': 'blocklist'}
+    if since is not None:
+        query['since'] = str(since)
+    request = urllib.request.Request(f'{url}?{urllib.parse.urlencode(query)}', headers={'Accept-Encoding': 'gzip'})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        body = response.read()
+        if response.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+    return json.loads(body)
+
+
+def sync(url: str, path: str) -> Blocklist:
+    '''
+    Business: Bring the local blocklist file up to date with the search function
+    Args: search function URL, local file path (created on first sync)
+    Returns: a Blocklist opened on the updated file
+    '''
+    current = Blocklist(path) if os.path.exists(path) else None
+    try:
+        payload = fetch(url, current.version if current is not None else None)
+        if 'snapshot' in payload:
+            _write(path, base64.b64decode(payload['snapshot']))
+        elif payload['version'] != current.version:
+            _write(path, apply_delta(current, payload))
+    finally:
+        if current is not None:
+            current.close()
+    return Blocklist(path)
+
+
+def main() -> int:
+    '''
+    Business: Sync a local blocklist file and check usernames against it
+    Args: --url of the search function, --path of the local file, usernames to check
+    Returns: exit code 0; prints one JSON report
+    '''
+    parser = argparse.ArgumentParser(description='Sync the published scam blocklist and check usernames offline')
+    parser.add_argument('--url', help='search function URL; without it the local file is used as is')
+    parser.add_argument('--path', default='blocklist.bin')
+    parser.add_argument('usernames', nargs='*')
+    args = parser.parse_args()
+
+    blocklist = sync(args.url, args.path) if args.url else Blocklist(args.path)
+    try:
+        print(json.dumps({
+            'version': blocklist.version,
+            'count': len(blocklist),
+            'flagged': {name: name in blocklist for name in args.usernames}
+        }, indent=2, ensure_ascii=False))
+    finally:
+        blocklist.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+import argparse
+import json
+import os
+import sys
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'search'))
+
+from db import checkout, release  # noqa: E402
+from index import handler  # noqa: E402
+
+
+def submit(username: str, reported_by: Optional[int] = None) -> Dict[str, Any]:
+    return handler({
+        'httpMethod': 'POST',
+        'headers': {},
+        'body': json.dumps({
+            'telegram_username': username,
+            'is_scammer': True,
+            'description': 'Concurrency check',
+            'evidence_url': 'https://example.com/proof.jpg',
+            'reported_by': reported_by
+        })
+    }, None)
+
+
+def main() -> int:
+    '''
+    Business: Submit the same new username from many threads at once against DATABASE_URL
+    Args: --requests total submissions, --workers parallel threads, --reporter users.id to rotate through
+    Returns: exit code 0 when exactly one report row holds every submission and counts each reporter once
+    '''
+    parser = argparse.ArgumentParser(description='Hammer the search report upsert with one username in parallel')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--reporter', type=int, action='append', default=[], help='existing users.id')
+    args = parser.parse_args()
+
+    base = f'hammer_{uuid.uuid4().hex[:12]}'
+    # Case and @ variants must all land on the same normalized row
+    variants = [base, base.upper(), f'@{base}', f' {base} ']
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        responses = list(executor.map(
+            submit,
+            (variants[i % len(variants)] for i in range(args.requests)),
+            (args.reporter[i % len(args.reporter)] if args.reporter else None for i in range(args.requests))
+        ))
+
+    failed = [r for r in responses if r['statusCode'] != 200]
+
+    conn = checkout()
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "SELECT id, report_count, distinct_reporters FROM scam_reports WHERE username_normalized = %s",
+            (base,)
+        )
+        rows = cur.fetchall()
+        evidence = 0
+        if rows:
+            cur.execute("SELECT COUNT(*) FROM report_evidence WHERE report_id = %s", (rows[0][0],))
+            evidence = cur.fetchone()[0]
+    finally:
+        cur.close()
+        release(conn)
+
+    reporters = len(set(args.reporter))
+    ok = (not failed and len(rows) == 1 and rows[0][1] == args.requests and evidence == args.requests
+          and rows[0][2] == reporters)
+    print(json.dumps({
+        'username': base,
+        'requests': args.requests,
+        'failed': len(failed),
+        'rows': len(rows),
+        'report_count': rows[0][1] if rows else 0,
+        'evidence_rows': evidence,
+        'distinct_reporters': rows[0][2] if rows else 0,
+        'ok': ok
+    }))
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
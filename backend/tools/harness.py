@@ -0,0 +1,346 @@
+import argparse
+import base64
+import contextlib
+import gzip
+import hashlib
+import importlib
+import json
+import os
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import psycopg2
+import psycopg2.extensions
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MIGRATIONS = os.path.join(os.path.dirname(BACKEND), 'db_migrations')
+# Replay order: accounts first, so later functions find their users
+FUNCTIONS = ('auth', 'profile', 'friends', 'chat', 'search')
+FIXTURE_PASSWORD = 'harness-password'
+
+# V0002 and later data migrations expect the first accounts to exist already
+FIXTURE_SQL = """
+    INSERT INTO users (user_id, email, password_hash) VALUES
+        ('#1001', 'admin@harness.local', %(hash)s),
+        ('#1002', 'member@harness.local', %(hash)s)
+"""
+FIXTURE_AFTER = 'V0001'
+
+
+class Function(NamedTuple):
+    name: str
+    handler: Any
+    modules: Dict[str, Any]
+
+
+class Invocation(NamedTuple):
+    status: int
+    headers: Dict[str, str]
+    body: Any
+    seconds: float
+
+
+def migration_files() -> List[str]:
+    return sorted(f for f in os.listdir(MIGRATIONS) if re.match(r'V\d+__.*\.sql$', f))
+
+
+def project_schema() -> Optional[str]:
+    '''The platform schema some migrations name explicitly (t_p<id>_<project>)'''
+    for name in migration_files():
+        with open(os.path.join(MIGRATIONS, name)) as f:
+            match = re.search(r'\b(t_p\d+_\w+)\.', f.read())
+        if match:
+            return match.group(1)
+    return None
+
+
+def _pg_bin() -> str:
+    if os.environ.get('PG_BIN'):
+        return os.environ['PG_BIN']
+    initdb = shutil.which('initdb')
+    if initdb:
+        return os.path.dirname(initdb)
+    pg_config = shutil.which('pg_config')
+    if pg_config:
+        return subprocess.check_output([pg_config, '--bindir'], text=True).strip()
+    raise RuntimeError('Postgres binaries not found: set PG_BIN or pass --dsn')
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def local_postgres() -> Iterator[str]:
+    '''
+    Business: Throwaway Postgres cluster in a temp dir, removed on exit
+    Args: PG_BIN or initdb on PATH
+    Returns: DSN of an empty database with pg_stat_statements preloaded
+    '''
+    bin_dir = _pg_bin()
+    root = tempfile.mkdtemp(prefix='harness-pg-')
+    data = os.path.join(root, 'data')
+    port = _free_port()
+    log = os.path.join(root, 'postgres.log')
+    subprocess.run([os.path.join(bin_dir, 'initdb'), '-D', data, '-U', 'postgres', '-A', 'trust', '-E', 'UTF8'],
+                   check=True, stdout=subprocess.DEVNULL)
+    options = (f'-p {port} -k {root} -c listen_addresses=127.0.0.1 -c fsync=off '
+               f'-c synchronous_commit=off -c shared_preload_libraries=pg_stat_statements')
+    subprocess.run([os.path.join(bin_dir, 'pg_ctl'), '-D', data, '-l', log, '-o', options, '-w', 'start'],
+                   check=True, stdout=subprocess.DEVNULL)
+    try:
+        yield f'postgresql://postgres@127.0.0.1:{port}/postgres'
+    finally:
+        subprocess.run([os.path.join(bin_dir, 'pg_ctl'), '-D', data, '-m', 'immediate', 'stop'],
+                       stdout=subprocess.DEVNULL)
+        shutil.rmtree(root, ignore_errors=True)
+
+
+@contextlib.contextmanager
+def scratch_database(server_dsn: str) -> Iterator[str]:
+    '''A uniquely named database on an existing server, dropped afterwards'''
+    name = f'harness_{uuid.uuid4().hex[:12]}'
+    admin = psycopg2.connect(server_dsn)
+    admin.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+    with admin.cursor() as cur:
+        cur.execute(f'CREATE DATABASE {name}')
+    try:
+        parts = urlsplit(server_dsn)
+        yield parts._replace(path=f'/{name}').geturl()
+    finally:
+        with admin.cursor() as cur:
+            cur.execute(f'DROP DATABASE IF EXISTS {name} WITH (FORCE)')
+        admin.close()
+
+
+@contextlib.contextmanager
+def database(server_dsn: Optional[str] = None) -> Iterator[str]:
+    '''Scratch database on --dsn when given, otherwise on a local throwaway cluster'''
+    with contextlib.ExitStack() as stack:
+        if server_dsn is None:
+            server_dsn = stack.enter_context(local_postgres())
+        yield stack.enter_context(scratch_database(server_dsn))
+
+
+def apply_migrations(dsn: str) -> List[str]:
+    '''
+    Business: Build the schema from db_migrations the way the platform does
+    Args: DSN of an empty database
+    Returns: applied migration names; fixture accounts are inserted after V0001
+    '''
+    conn = psycopg2.connect(dsn)
+    cur = conn.cursor()
+    schema = project_schema()
+    if schema:
+        cur.execute(f'CREATE SCHEMA IF NOT EXISTS {schema}')
+        cur.execute(f'ALTER DATABASE {conn.info.dbname} SET search_path TO {schema}, public')
+        cur.execute(f'SET search_path TO {schema}, public')
+    cur.execute('CREATE EXTENSION IF NOT EXISTS pg_stat_statements SCHEMA public')
+    conn.commit()
+
+    applied = []
+    fixture_hash = hashlib.sha256(FIXTURE_PASSWORD.encode()).hexdigest()
+    for name in migration_files():
+        with open(os.path.join(MIGRATIONS, name)) as f:
+            cur.execute(f.read())
+        if name.startswith(FIXTURE_AFTER + '__'):
+            cur.execute(FIXTURE_SQL, {'hash': fixture_hash})
+        conn.commit()
+        applied.append(name)
+    cur.close()
+    conn.close()
+    return applied
+
+
+def configure_environment(dsn: str, scratch_dir: str) -> None:
+    '''Env the functions read; existing values (e.g. pool size) are kept'''
+    os.environ['DATABASE_URL'] = dsn
+    os.environ.setdefault('SESSION_KEYS', f'harness:{uuid.uuid4().hex}')
+    os.environ.setdefault('INVOCATION_LOG', 'off')
+    os.environ.setdefault('BLOB_STORE', 'local')
+    os.environ.setdefault('BLOB_LOCAL_ROOT', os.path.join(scratch_dir, 'blobs'))
+    os.environ.setdefault('BLOB_PUBLIC_URL', 'file://' + os.path.join(scratch_dir, 'blobs'))
+
+
+def load_function(name: str) -> Function:
+    '''
+    Business: Import a function's index.py in-process
+    Args: function directory name under backend/
+    Returns: its handler and its own copies of db, runtime, ...
+
+    Every function ships modules with the same names, so each one is
+    imported with a clean slate and taken out of sys.modules afterwards.
+    '''
+    path = os.path.join(BACKEND, name)
+    local = {f[:-3] for f in os.listdir(path) if f.endswith('.py')}
+    saved = {m: sys.modules.pop(m) for m in local if m in sys.modules}
+    sys.path.insert(0, path)
+    try:
+        index = importlib.import_module('index')
+        modules = {m: sys.modules[m] for m in local if m in sys.modules}
+    finally:
+        sys.path.remove(path)
+        for m in local:
+            sys.modules.pop(m, None)
+        sys.modules.update(saved)
+    return Function(name, index.handler, modules)
+
+
+def close_pool(function: Function) -> None:
+    db = function.modules.get('db')
+    if db is not None and db._pool is not None:
+        db._pool.close()
+
+
+def make_event(method: str, path: str, body: Any = None, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    parts = urlsplit(path)
+    return {
+        'httpMethod': method,
+        'path': parts.path or '/',
+        'queryStringParameters': dict(parse_qsl(parts.query)) or None,
+        'headers': dict(headers or {}),
+        'body': json.dumps(body) if body is not None else None,
+        'isBase64Encoded': False
+    }
+
+
+def _decode_body(response: Dict[str, Any]) -> Any:
+    body = response.get('body') or ''
+    if response.get('isBase64Encoded'):
+        raw = base64.b64decode(body)
+        encoding = (response.get('headers') or {}).get('Content-Encoding')
+        if encoding == 'gzip':
+            raw = gzip.decompress(raw)
+        elif encoding == 'br' and brotli is not None:
+            raw = brotli.decompress(raw)
+        body = raw.decode()
+    if not body:
+        return None
+    try:
+        return json.loads(body)
+    except ValueError:
+        return body
+
+
+def invoke(function: Function, event: Dict[str, Any]) -> Invocation:
+    started = time.perf_counter()
+    response = function.handler(event, None)
+    elapsed = time.perf_counter() - started
+    return Invocation(response['statusCode'], response.get('headers') or {}, _decode_body(response), elapsed)
+
+
+TYPE_NAMES = {
+    'string': str,
+    'number': (int, float),
+    'boolean': bool,
+    'array': list,
+    'object': dict
+}
+
+
+def _matches(expected: Any, actual: Any) -> bool:
+    if isinstance(expected, str) and expected in TYPE_NAMES:
+        kind = TYPE_NAMES[expected]
+        return isinstance(actual, kind) and not (expected == 'number' and isinstance(actual, bool))
+    return expected == actual
+
+
+def body_mismatches(expected: Dict[str, Any], actual: Any, partial: bool) -> List[str]:
+    '''Differences between a tests.json expectedBody and the response body'''
+    if not isinstance(actual, dict):
+        return [f'body is {type(actual).__name__}, expected object']
+    problems = [f'{key}: expected {value!r}, got {actual.get(key)!r}'
+                for key, value in expected.items() if key not in actual or not _matches(value, actual[key])]
+    if not partial:
+        problems += [f'{key}: unexpected' for key in actual if key not in expected]
+    return problems
+
+
+@contextlib.contextmanager
+def case_environment(overrides: Optional[Dict[str, str]]) -> Iterator[None]:
+    '''Environment variables of one tests.json case ("env"), restored afterwards'''
+    saved = {name: os.environ.get(name) for name in overrides or {}}
+    os.environ.update(overrides or {})
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def run_case(function: Function, case: Dict[str, Any]) -> Dict[str, Any]:
+    event = make_event(case['method'], case.get('path', '/'), case.get('body'), case.get('headers'))
+    with case_environment(case.get('env')):
+        result = invoke(function, event)
+    problems = []
+    if result.status != case.get('expectedStatus', 200):
+        problems.append(f'status: expected {case.get("expectedStatus", 200)}, got {result.status}')
+    if 'expectedBody' in case:
+        problems += body_mismatches(case['expectedBody'], result.body, case.get('bodyMatcher') == 'partial')
+    outcome = {'function': function.name, 'name': case['name'], 'status': result.status, 'ok': not problems}
+    if problems:
+        outcome['problems'] = problems
+        outcome['body'] = result.body
+    return outcome
+
+
+def replay(functions: Tuple[str, ...] = FUNCTIONS) -> List[Dict[str, Any]]:
+    '''Run every tests.json case of the given functions in file order against the configured database'''
+    outcomes = []
+    for name in functions:
+        function = load_function(name)
+        with open(os.path.join(BACKEND, name, 'tests.json')) as f:
+            cases = json.load(f)['tests']
+        try:
+            outcomes += [run_case(function, case) for case in cases]
+        finally:
+            close_pool(function)
+    return outcomes
+
+
+def main() -> int:
+    '''
+    Business: Replay every function's tests.json in-process against a freshly migrated database
+    Args: --dsn existing server (a scratch database is created and dropped), --function to limit the run
+    Returns: exit code 0 when every case passes; prints one JSON report
+    '''
+    parser = argparse.ArgumentParser(description='Replay tests.json cases against a local database')
+    parser.add_argument('--dsn', help='server to create the scratch database on (default: throwaway cluster via PG_BIN)')
+    parser.add_argument('--function', action='append', choices=FUNCTIONS, help='limit to these functions')
+    args = parser.parse_args()
+
+    with database(args.dsn) as dsn, tempfile.TemporaryDirectory(prefix='harness-') as scratch:
+        migrations = apply_migrations(dsn)
+        configure_environment(dsn, scratch)
+        outcomes = replay(tuple(args.function or FUNCTIONS))
+
+    failed = [o for o in outcomes if not o['ok']]
+    print(json.dumps({
+        'migrations': len(migrations),
+        'cases': len(outcomes),
+        'failed': len(failed),
+        'results': outcomes
+    }, indent=2, sort_keys=True, ensure_ascii=False, default=str))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
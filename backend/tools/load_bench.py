@@ -0,0 +1,412 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import (  # noqa: E402
+    FIXTURE_PASSWORD, Function, apply_migrations, close_pool, configure_environment,
+    database, invoke, load_function, make_event,
+)
+
+# Seeded volumes scale with --scale; 1 is a few seconds of seeding
+VOLUMES = {
+    'users': 5000,
+    'scam_reports': 20000,
+    'evidence_per_report': 2,
+    'ratings': 40000,
+    'friendships': 30000,
+    'chats': 4000,
+    'messages': 80000,
+    'reports': 5000
+}
+
+# Rows are generated server side; setseed() makes random() repeat across runs
+SEED_SQL = [
+    """
+    INSERT INTO users (email, password_hash, is_creator, created_at)
+    SELECT 'load' || g || '@example.com', %(password_hash)s, random() < 0.05,
+           now() - random() * interval '365 days'
+    FROM generate_series(1, %(users)s) g
+    """,
+    """
+    INSERT INTO scam_reports (telegram_username, is_scammer, report_count, description,
+                              reported_by, evidence_url, likes, dislikes)
+    SELECT 'acc_' || substr(md5(g::text), 1, 4 + (g %% 8)) || '_' || g, random() < 0.6,
+           1 + floor(random() * 20)::int, 'Seeded report ' || g,
+           1 + floor(random() * %(users)s)::int, 'https://example.com/e/' || g,
+           floor(random() * 50)::int, floor(random() * 20)::int
+    FROM generate_series(1, %(scam_reports)s) g
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO report_evidence (report_id, evidence_url, uploaded_by)
+    SELECT r.id, 'https://example.com/e/' || r.id || '/' || n, r.reported_by
+    FROM scam_reports r CROSS JOIN generate_series(1, %(evidence_per_report)s) n
+    """,
+    """
+    UPDATE scam_reports
+    SET distinct_reporters = 1 + floor(random() * LEAST(report_count, 5))::int,
+        evidence_count = %(evidence_per_report)s,
+        scammer_reports = CASE WHEN is_scammer THEN report_count ELSE floor(random() * report_count / 2)::int END,
+        last_reported_at = now() - random() * interval '365 days'
+    """,
+    """
+    INSERT INTO user_ratings (report_id, user_id, rating_type)
+    SELECT 1 + floor(random() * %(scam_reports)s)::int, 1 + floor(random() * %(users)s)::int,
+           CASE WHEN random() < 0.7 THEN 'like' ELSE 'dislike' END
+    FROM generate_series(1, %(ratings)s)
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO friendships (user_id, friend_id, status)
+    SELECT a, b, (ARRAY['pending', 'accepted', 'accepted', 'rejected'])[1 + floor(random() * 4)::int]
+    FROM (
+        SELECT 1 + floor(power(random(), 3) * %(users)s)::int AS a,
+               1 + floor(random() * %(users)s)::int AS b
+        FROM generate_series(1, %(friendships)s)
+    ) pairs
+    WHERE a <> b
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO chats (user_low, user_high)
+    SELECT DISTINCT LEAST(a, b), GREATEST(a, b)
+    FROM (
+        SELECT 1 + floor(power(random(), 2) * %(users)s)::int AS a,
+               1 + floor(random() * %(users)s)::int AS b
+        FROM generate_series(1, %(chats)s)
+    ) pairs
+    WHERE a <> b
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO chat_participants (chat_id, user_id)
+    SELECT id, user_low FROM chats UNION ALL SELECT id, user_high FROM chats
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO messages (chat_id, sender_id, message_text, created_at)
+    SELECT c.id, CASE WHEN random() < 0.5 THEN c.user_low ELSE c.user_high END,
+           'message ' || g, now() - (%(messages)s - g) * interval '1 second'
+    FROM generate_series(1, %(messages)s) g
+    JOIN chats c ON c.id = 1 + (g * 7919) %% (SELECT max(id) FROM chats)
+    """,
+    """
+    INSERT INTO chat_inbox (user_id, chat_id, peer_id, last_message_id, last_message_text, last_message_at)
+    SELECT p.user_id, p.chat_id, CASE WHEN p.user_id = c.user_low THEN c.user_high ELSE c.user_low END,
+           last.id, last.message_text, last.created_at
+    FROM chat_participants p
+    JOIN chats c ON c.id = p.chat_id
+    LEFT JOIN LATERAL (
+        SELECT m.id, m.message_text, m.created_at FROM messages m
+        WHERE m.chat_id = p.chat_id ORDER BY m.id DESC LIMIT 1
+    ) last ON TRUE
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO reports (reporter_id, reported_user_id, reason, status)
+    SELECT 1 + floor(random() * %(users)s)::int, 1 + floor(random() * %(users)s)::int, 'seeded',
+           (ARRAY['pending', 'pending', 'resolved'])[1 + floor(random() * 3)::int]
+    FROM generate_series(1, %(reports)s)
+    """
+]
+
+# Sub-millisecond jitter is not a regression whatever the ratio
+MIN_LATENCY_DELTA_MS = 0.5
+
+STATEMENTS_SQL = """
+    SELECT COALESCE(sum(calls), 0) FROM public.pg_stat_statements
+    WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+      AND query NOT ILIKE '%pg_stat%'
+      AND query !~* '^\s*(BEGIN|COMMIT|ROLLBACK)'
+"""
+
+TABLE_STATS_SQL = """
+    SELECT COALESCE(sum(seq_scan), 0), COALESCE(sum(seq_tup_read), 0) + COALESCE(sum(idx_tup_fetch), 0)
+    FROM pg_stat_user_tables
+"""
+
+
+class Scenario(NamedTuple):
+    name: str
+    function: str
+    event: Callable[[random.Random], Dict[str, Any]]
+    weight: float = 1.0
+
+
+def seed(dsn: str, seed_value: int, scale: float, password_hash: str) -> Dict[str, int]:
+    '''
+    Business: Fill the migrated database with deterministic, skewed data
+    Args: DSN, seed for setseed(), volume multiplier, password hash shared by all seeded accounts
+    Returns: row counts per table
+    '''
+    volumes = {k: max(1, int(v * scale)) if k != 'evidence_per_report' else v for k, v in VOLUMES.items()}
+    conn = psycopg2.connect(dsn)
+    cur = conn.cursor()
+    # Background auto-analyze would resample statistics mid-run and flip plans between runs
+    cur.execute("SELECT format('%I.%I', schemaname, relname) FROM pg_stat_user_tables")
+    for (table,) in cur.fetchall():
+        cur.execute(f'ALTER TABLE {table} SET (autovacuum_enabled = off)')
+    cur.execute('SELECT setseed(%s)', (((seed_value % 2000) - 1000) / 1000.0,))
+    for sql in SEED_SQL:
+        cur.execute(sql, dict(volumes, password_hash=password_hash))
+    conn.commit()
+    conn.autocommit = True
+    cur.execute('ANALYZE')
+    counts = {}
+    for table in ('users', 'scam_reports', 'report_evidence', 'user_ratings', 'friendships',
+                  'chats', 'messages', 'chat_inbox', 'reports'):
+        cur.execute(f'SELECT count(*) FROM {table}')
+        counts[table] = cur.fetchone()[0]
+    cur.close()
+    conn.close()
+    return counts
+
+
+def scenarios(counts: Dict[str, int], usernames: List[str], report_ids: List[int],
+              chats: List[Tuple[int, int, int]]) -> List[Scenario]:
+    users = counts['users']
+
+    def skewed_user(rng: random.Random) -> int:
+        return 1 + int(rng.random() ** 3 * users)
+
+    def any_user(rng: random.Random) -> int:
+        return rng.randint(1, users)
+
+    def chat_member(rng: random.Random) -> Tuple[int, int]:
+        # Only participants may read or post, so pair each chat with one of its two users
+        chat_id, user_low, user_high = rng.choice(chats)
+        return chat_id, rng.choice((user_low, user_high))
+
+    def messages_event(rng: random.Random) -> Dict[str, Any]:
+        chat_id, user_id = chat_member(rng)
+        return make_event('GET', f'/?action=messages&chat_id={chat_id}&user_id={user_id}&limit=50')
+
+    def send_event(rng: random.Random) -> Dict[str, Any]:
+        chat_id, sender_id = chat_member(rng)
+        return make_event('POST', '/', {
+            'action': 'send_message', 'chat_id': chat_id, 'sender_id': sender_id, 'message_text': 'load'
+        })
+
+    return [
+        Scenario('auth.login', 'auth', lambda rng: make_event('POST', '/', {
+            'action': 'login', 'email': f'load{rng.randint(1, users - 2)}@example.com', 'password': FIXTURE_PASSWORD
+        }), weight=0.1),
+        Scenario('profile.get', 'profile', lambda rng: make_event('GET', f'/?user_id={any_user(rng)}')),
+        Scenario('friends.list', 'friends', lambda rng: make_event('GET', f'/?user_id={skewed_user(rng)}&limit=50')),
+        Scenario('friends.list_compact', 'friends', lambda rng: make_event(
+            'GET', f'/?user_id={skewed_user(rng)}&limit=50&view=compact&fields=user_id')),
+        Scenario('chat.chats', 'chat', lambda rng: make_event('GET', f'/?action=chats&user_id={skewed_user(rng)}')),
+        Scenario('chat.messages', 'chat', messages_event),
+        Scenario('search.exact', 'search', lambda rng: make_event(
+            'GET', f'/?username={rng.choice(usernames)}&mode=exact')),
+        Scenario('search.prefix', 'search', lambda rng: make_event(
+            'GET', f'/?username={rng.choice(usernames)[:6]}&mode=prefix&limit=20')),
+        Scenario('search.substring', 'search', lambda rng: make_event(
+            'GET', f'/?username={rng.choice(usernames)[4:8]}&mode=substring&limit=20')),
+        Scenario('search.by_score', 'search', lambda rng: make_event(
+            'GET', f'/?username={rng.choice(usernames)[:5]}&mode=prefix&sort=score&min_score=40&limit=20')),
+        Scenario('search.bulk_lookup', 'search', lambda rng: make_event('POST', '/', {
+            'action': 'bulk_lookup', 'usernames': rng.sample(usernames, 200)
+        })),
+        Scenario('search.admin', 'search', lambda rng: make_event(
+            'GET', '/?resource=reports&status=pending&limit=50', headers={'X-User-Id': '1001'}), weight=0.2),
+        Scenario('search.vote', 'search', lambda rng: make_event('PUT', '/', {
+            'report_id': rng.choice(report_ids), 'user_id': any_user(rng),
+            'rating_type': rng.choice(('like', 'dislike'))
+        })),
+        Scenario('search.report', 'search', lambda rng: make_event('POST', '/', {
+            'telegram_username': rng.choice(usernames), 'is_scammer': True, 'description': 'load',
+            'evidence_url': f'https://example.com/load/{rng.random()}', 'reported_by': any_user(rng)
+        }), weight=0.5),
+        Scenario('chat.send_message', 'chat', send_event, weight=0.5)
+    ]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    '''Nearest-rank percentile'''
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class StatsReader:
+    '''Server-side counters; statement counts need pg_stat_statements'''
+
+    def __init__(self, dsn: str):
+        self.conn = psycopg2.connect(dsn)
+        self.conn.autocommit = True
+        self.cur = self.conn.cursor()
+        self.cur.execute("SELECT to_regclass('public.pg_stat_statements') IS NOT NULL")
+        self.has_statements = self.cur.fetchone()[0]
+
+    def statements(self) -> Optional[int]:
+        if not self.has_statements:
+            return None
+        self.cur.execute(STATEMENTS_SQL)
+        return int(self.cur.fetchone()[0])
+
+    def tables(self, settle: float = 2.0) -> tuple:
+        # Backends flush table counters when they exit; wait until the totals stop moving
+        deadline = time.monotonic() + settle
+        previous = None
+        while True:
+            self.cur.execute('SELECT pg_stat_clear_snapshot()')
+            self.cur.execute(TABLE_STATS_SQL)
+            current = tuple(int(v) for v in self.cur.fetchone())
+            if current == previous or time.monotonic() > deadline:
+                return current
+            previous = current
+            time.sleep(0.2)
+
+    def close(self) -> None:
+        self.cur.close()
+        self.conn.close()
+
+
+def run_scenario(scenario: Scenario, function: Function, requests: int, warmup: int,
+                 seed_value: int, stats: StatsReader) -> Dict[str, Any]:
+    rng = random.Random(f'{seed_value}:{scenario.name}')
+    for _ in range(warmup):
+        invoke(function, scenario.event(rng))
+
+    close_pool(function)
+    statements_before = stats.statements()
+    seq_before, rows_before = stats.tables()
+
+    latencies = []
+    statuses: Dict[str, int] = {}
+    for _ in range(requests):
+        result = invoke(function, scenario.event(rng))
+        latencies.append(result.seconds * 1000)
+        statuses[str(result.status)] = statuses.get(str(result.status), 0) + 1
+
+    close_pool(function)
+    statements_after = stats.statements()
+    seq_after, rows_after = stats.tables()
+    latencies.sort()
+
+    return {
+        'requests': requests,
+        'statuses': statuses,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'queries_per_request': (None if statements_before is None
+                                else round((statements_after - statements_before) / requests, 2)),
+        'seq_scans_per_request': round((seq_after - seq_before) / requests, 2),
+        'rows_scanned_per_request': round((rows_after - rows_before) / requests, 1)
+    }
+
+
+def failed_requests(report: Dict[str, Any]) -> List[str]:
+    '''Endpoints that answered anything but 2xx, with the count per status'''
+    return [f'{name} status {status}: {count} of {current["requests"]}'
+            for name, current in report['endpoints'].items()
+            for status, count in sorted(current['statuses'].items()) if not status.startswith('2')]
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    '''Regressions against an earlier report: slower percentiles beyond tolerance, any rise in query or scan counts'''
+    regressions = []
+    for name, current in report['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(name)
+        if previous is None:
+            continue
+        for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+            if current[key] > previous[key] * (1 + tolerance) and current[key] - previous[key] > MIN_LATENCY_DELTA_MS:
+                regressions.append(f'{name} {key}: {previous[key]} -> {current[key]}')
+        for key in ('queries_per_request', 'seq_scans_per_request', 'rows_scanned_per_request'):
+            if previous.get(key) is not None and current.get(key) is not None and current[key] > previous[key] * 1.05:
+                regressions.append(f'{name} {key}: {previous[key]} -> {current[key]}')
+    return regressions
+
+
+def main() -> int:
+    '''
+    Business: Seed a throwaway database and measure every endpoint in-process
+    Args: --seed, --scale, --requests per endpoint, --only, --out, --baseline with --tolerance
+    Returns: exit code 1 when an endpoint answers non-2xx or --baseline shows regressions; the report is stable JSON
+    '''
+    parser = argparse.ArgumentParser(description='Seeded load benchmark of all backend functions')
+    parser.add_argument('--dsn', help='server to create the scratch database on (default: throwaway cluster via PG_BIN)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--scale', type=float, default=1.0)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--only', action='append', help='endpoint names to run, e.g. search.prefix')
+    parser.add_argument('--out', help='write the report here as well as to stdout')
+    parser.add_argument('--baseline', help='earlier report to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed latency growth vs baseline')
+    args = parser.parse_args()
+
+    with database(args.dsn) as dsn, tempfile.TemporaryDirectory(prefix='load-bench-') as scratch:
+        apply_migrations(dsn)
+        configure_environment(dsn, scratch)
+        functions: Dict[str, Function] = {}
+
+        def function(name: str) -> Function:
+            if name not in functions:
+                functions[name] = load_function(name)
+            return functions[name]
+
+        counts = seed(dsn, args.seed, args.scale, function('auth').modules['passwords'].hash_password(FIXTURE_PASSWORD))
+        with psycopg2.connect(dsn) as conn, conn.cursor() as cur:
+            cur.execute('SELECT id, telegram_username FROM scam_reports ORDER BY id')
+            reports = cur.fetchall()
+            cur.execute('SELECT id, user_low, user_high FROM chats ORDER BY id')
+            chats = cur.fetchall()
+        usernames = [r[1] for r in reports]
+        conn.close()
+
+        stats = StatsReader(dsn)
+        endpoints = {}
+        try:
+            for scenario in scenarios(counts, usernames, [r[0] for r in reports], chats):
+                if args.only and scenario.name not in args.only:
+                    continue
+                requests = max(1, int(args.requests * scenario.weight))
+                warmup = max(1, int(args.warmup * scenario.weight))
+                endpoints[scenario.name] = run_scenario(
+                    scenario, function(scenario.function), requests, warmup, args.seed, stats)
+        finally:
+            stats.close()
+            for f in functions.values():
+                close_pool(f)
+
+    report = {
+        'config': {'seed': args.seed, 'scale': args.scale, 'requests': args.requests, 'warmup': args.warmup},
+        'data': counts,
+        'endpoints': endpoints
+    }
+    output = json.dumps(report, indent=2, sort_keys=True)
+    print(output)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(output + '\n')
+
+    # Timings of error answers say nothing about the endpoint, so any of them fails the run
+    failures = failed_requests(report)
+    for line in failures:
+        print(f'FAILED {line}', file=sys.stderr)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f'REGRESSION {line}', file=sys.stderr)
+    return 1 if failures or regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,62 @@
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'auth'))
+
+from index import handler  # noqa: E402
+
+
+def register(email: str) -> Dict[str, Any]:
+    response = handler({
+        'httpMethod': 'POST',
+        'headers': {},
+        'body': json.dumps({'action': 'register', 'email': email, 'password': 'load-test-password'})
+    }, None)
+    return {'status': response['statusCode'], 'body': json.loads(response['body'])}
+
+
+def main() -> int:
+    '''
+    Business: Register many accounts concurrently against DATABASE_URL and check public ids
+    Args: --signups total registrations, --workers parallel threads
+    Returns: exit code 0 when every signup succeeded with a distinct user_id
+    '''
+    parser = argparse.ArgumentParser(description='Concurrent signup load test for the auth function')
+    parser.add_argument('--signups', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=32)
+    args = parser.parse_args()
+
+    run = uuid.uuid4().hex[:8]
+    emails = [f'load-{run}-{i}@example.com' for i in range(args.signups)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        results = list(executor.map(register, emails))
+    elapsed = time.perf_counter() - started
+
+    statuses = Counter(r['status'] for r in results)
+    user_ids = Counter(r['body'].get('user_id') for r in results if r['status'] == 200)
+    collisions = sum(count - 1 for count in user_ids.values() if count > 1)
+    ok = statuses == Counter({200: args.signups}) and collisions == 0
+
+    print(json.dumps({
+        'signups': args.signups,
+        'workers': args.workers,
+        'seconds': round(elapsed, 3),
+        'signups_per_second': round(args.signups / elapsed, 1),
+        'statuses': {str(k): v for k, v in statuses.items()},
+        'distinct_user_ids': len(user_ids),
+        'collisions': collisions,
+        'ok': ok
+    }, indent=2))
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,14 @@
+-- Normalized username for exact, prefix and substring lookups
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE scam_reports
+    ADD COLUMN IF NOT EXISTS username_normalized VARCHAR(255)
+    GENERATED ALWAYS AS (lower(ltrim(btrim(telegram_username), '@'))) STORED;
+
+-- Exact and prefix matches (LIKE 'term%')
+CREATE INDEX IF NOT EXISTS idx_scam_reports_username_prefix
+    ON scam_reports (username_normalized text_pattern_ops);
+
+-- Substring matches (LIKE '%term%')
+CREATE INDEX IF NOT EXISTS idx_scam_reports_username_trgm
+    ON scam_reports USING gin (username_normalized gin_trgm_ops);
@@ -0,0 +1,63 @@
+-- Merge reports that differ only by case or a leading @ so usernames can be unique
+CREATE TEMP TABLE scam_report_merge AS
+SELECT id AS duplicate_id, keep_id
+FROM (
+    SELECT id, MIN(id) OVER (PARTITION BY username_normalized) AS keep_id
+    FROM scam_reports
+) grouped
+WHERE id <> keep_id;
+
+UPDATE scam_reports s
+SET report_count = s.report_count + d.extra_reports,
+    updated_at = GREATEST(s.updated_at, d.last_updated)
+FROM (
+    SELECT m.keep_id, SUM(r.report_count) AS extra_reports, MAX(r.updated_at) AS last_updated
+    FROM scam_report_merge m
+    JOIN scam_reports r ON r.id = m.duplicate_id
+    GROUP BY m.keep_id
+) d
+WHERE s.id = d.keep_id;
+
+UPDATE report_evidence e
+SET report_id = m.keep_id
+FROM scam_report_merge m
+WHERE e.report_id = m.duplicate_id;
+
+-- A user keeps one rating per merged report, the one given to the oldest report wins
+DELETE FROM user_ratings ur
+USING (
+    SELECT r.id,
+           ROW_NUMBER() OVER (
+               PARTITION BY COALESCE(m.keep_id, r.report_id), r.user_id
+               ORDER BY r.report_id, r.id
+           ) AS position
+    FROM user_ratings r
+    LEFT JOIN scam_report_merge m ON m.duplicate_id = r.report_id
+) ranked
+WHERE ur.id = ranked.id AND ranked.position > 1;
+
+UPDATE user_ratings ur
+SET report_id = m.keep_id
+FROM scam_report_merge m
+WHERE ur.report_id = m.duplicate_id;
+
+UPDATE scam_reports s
+SET likes = c.likes, dislikes = c.dislikes
+FROM (
+    SELECT m.keep_id,
+           COUNT(ur.id) FILTER (WHERE ur.rating_type = 'like') AS likes,
+           COUNT(ur.id) FILTER (WHERE ur.rating_type = 'dislike') AS dislikes
+    FROM (SELECT DISTINCT keep_id FROM scam_report_merge) m
+    LEFT JOIN user_ratings ur ON ur.report_id = m.keep_id
+    GROUP BY m.keep_id
+) c
+WHERE s.id = c.keep_id;
+
+DELETE FROM scam_reports s
+USING scam_report_merge m
+WHERE s.id = m.duplicate_id;
+
+DROP TABLE scam_report_merge;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_scam_reports_username_normalized
+    ON scam_reports (username_normalized);
@@ -0,0 +1,5 @@
+-- Keyset pagination of a chat's history is a range scan on (chat_id, id)
+CREATE INDEX IF NOT EXISTS idx_messages_chat_id_id ON messages (chat_id, id);
+
+-- Covered by the composite index above
+DROP INDEX IF EXISTS idx_messages_chat_id;
@@ -0,0 +1,33 @@
+-- Per-participant inbox: last message and unread count maintained by send_message
+CREATE TABLE IF NOT EXISTS chat_inbox (
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    chat_id INTEGER NOT NULL REFERENCES chats(id),
+    peer_id INTEGER REFERENCES users(id),
+    last_message_id INTEGER REFERENCES messages(id),
+    last_message_text TEXT,
+    last_message_at TIMESTAMP,
+    unread_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, chat_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_chat_inbox_user_last_message
+    ON chat_inbox (user_id, last_message_at DESC NULLS LAST, chat_id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_chat_inbox_chat ON chat_inbox (chat_id);
+
+INSERT INTO chat_inbox (user_id, chat_id, peer_id, last_message_id, last_message_text, last_message_at)
+SELECT cp.user_id, cp.chat_id, peer.user_id, last.id, last.message_text, last.created_at
+FROM chat_participants cp
+LEFT JOIN LATERAL (
+    SELECT p.user_id FROM chat_participants p
+    WHERE p.chat_id = cp.chat_id AND p.user_id <> cp.user_id
+    ORDER BY p.id
+    LIMIT 1
+) peer ON TRUE
+LEFT JOIN LATERAL (
+    SELECT m.id, m.message_text, m.created_at FROM messages m
+    WHERE m.chat_id = cp.chat_id
+    ORDER BY m.id DESC
+    LIMIT 1
+) last ON TRUE
+ON CONFLICT (user_id, chat_id) DO NOTHING;
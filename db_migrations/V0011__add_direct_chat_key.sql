@@ -0,0 +1,65 @@
+-- Canonical participant pair for direct chats: (smaller user id, larger user id)
+ALTER TABLE chats ADD COLUMN IF NOT EXISTS user_low INTEGER REFERENCES users(id);
+ALTER TABLE chats ADD COLUMN IF NOT EXISTS user_high INTEGER REFERENCES users(id);
+
+UPDATE chats c
+SET user_low = pair.user_low, user_high = pair.user_high
+FROM (
+    SELECT chat_id, MIN(user_id) AS user_low, MAX(user_id) AS user_high
+    FROM chat_participants
+    GROUP BY chat_id
+    HAVING COUNT(*) = 2
+) pair
+WHERE c.id = pair.chat_id;
+
+-- Merge duplicate chats of the same pair into the oldest one
+CREATE TEMP TABLE chat_merge AS
+SELECT id AS duplicate_id, keep_id
+FROM (
+    SELECT id, MIN(id) OVER (PARTITION BY user_low, user_high) AS keep_id
+    FROM chats
+    WHERE user_low IS NOT NULL
+) grouped
+WHERE id <> keep_id;
+
+UPDATE messages m
+SET chat_id = cm.keep_id
+FROM chat_merge cm
+WHERE m.chat_id = cm.duplicate_id;
+
+UPDATE chat_inbox i
+SET unread_count = i.unread_count + d.unread_count
+FROM (
+    SELECT cm.keep_id, di.user_id, SUM(di.unread_count) AS unread_count
+    FROM chat_merge cm
+    JOIN chat_inbox di ON di.chat_id = cm.duplicate_id
+    GROUP BY cm.keep_id, di.user_id
+) d
+WHERE i.chat_id = d.keep_id AND i.user_id = d.user_id;
+
+DELETE FROM chat_inbox i
+USING chat_merge cm
+WHERE i.chat_id = cm.duplicate_id;
+
+UPDATE chat_inbox i
+SET last_message_id = last.id, last_message_text = last.message_text, last_message_at = last.created_at
+FROM (SELECT DISTINCT keep_id FROM chat_merge) k
+CROSS JOIN LATERAL (
+    SELECT m.id, m.message_text, m.created_at FROM messages m
+    WHERE m.chat_id = k.keep_id
+    ORDER BY m.id DESC
+    LIMIT 1
+) last
+WHERE i.chat_id = k.keep_id;
+
+DELETE FROM chat_participants p
+USING chat_merge cm
+WHERE p.chat_id = cm.duplicate_id;
+
+DELETE FROM chats c
+USING chat_merge cm
+WHERE c.id = cm.duplicate_id;
+
+DROP TABLE chat_merge;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_chats_direct_pair ON chats (user_low, user_high);
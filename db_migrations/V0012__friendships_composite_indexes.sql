@@ -0,0 +1,10 @@
+-- Each side of a friendship is read by its own index range, newest first:
+-- (side, id) for the default unfiltered list, (side, status, id) for ?status=
+CREATE INDEX IF NOT EXISTS idx_friendships_user_id_id ON friendships (user_id, id);
+CREATE INDEX IF NOT EXISTS idx_friendships_friend_id_id ON friendships (friend_id, id);
+CREATE INDEX IF NOT EXISTS idx_friendships_user_status_id ON friendships (user_id, status, id);
+CREATE INDEX IF NOT EXISTS idx_friendships_friend_status_id ON friendships (friend_id, status, id);
+
+-- Covered by the (side, id) indexes above
+DROP INDEX IF EXISTS idx_friendships_user;
+DROP INDEX IF EXISTS idx_friendships_friend;
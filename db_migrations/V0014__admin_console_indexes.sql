@@ -0,0 +1,10 @@
+-- Admin lists page by id (newest first) within their filters
+CREATE INDEX IF NOT EXISTS idx_users_creator_id ON users (is_creator, id DESC);
+CREATE INDEX IF NOT EXISTS idx_users_created_at ON users (created_at);
+CREATE INDEX IF NOT EXISTS idx_users_email_prefix ON users (email text_pattern_ops);
+
+CREATE INDEX IF NOT EXISTS idx_reports_status_id ON reports (status, id DESC);
+CREATE INDEX IF NOT EXISTS idx_reports_created_at ON reports (created_at);
+
+-- Covered by idx_reports_status_id
+DROP INDEX IF EXISTS idx_reports_status;
@@ -0,0 +1,12 @@
+-- Public ids (#1000, #1001, ...) come from a sequence instead of COUNT(*) at signup.
+-- Existing ids are kept; the sequence continues after the largest one.
+CREATE SEQUENCE IF NOT EXISTS users_public_number_seq MINVALUE 1000 START WITH 1000;
+
+SELECT setval(
+    'users_public_number_seq',
+    COALESCE((SELECT MAX(substring(user_id FROM 2)::bigint) FROM users WHERE user_id ~ '^#[0-9]+$'), 999) + 1,
+    false
+);
+
+ALTER TABLE users ALTER COLUMN user_id SET DEFAULT '#' || nextval('users_public_number_seq');
+ALTER SEQUENCE users_public_number_seq OWNED BY users.user_id;
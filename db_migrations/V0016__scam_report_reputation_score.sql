@@ -0,0 +1,66 @@
+-- Stored reputation score per reported username: 0 = no signal, 100 = strongly confirmed scammer.
+-- Inputs are kept as counters next to it so report and vote writes can update them incrementally.
+ALTER TABLE scam_reports
+    ADD COLUMN IF NOT EXISTS distinct_reporters INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS evidence_count INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS scammer_reports INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS last_reported_at TIMESTAMP,
+    ADD COLUMN IF NOT EXISTS scam_score SMALLINT NOT NULL DEFAULT 0;
+
+-- Weights: distinct reporters 35%, share of reports flagging a scam 30%, evidence 20%, report volume 15%.
+-- Votes on the report scale that by 0.5..1.5 and the signal fades to 60% over about half a year.
+CREATE OR REPLACE FUNCTION scam_score(
+    report_count INTEGER,
+    distinct_reporters INTEGER,
+    evidence_count INTEGER,
+    scammer_reports INTEGER,
+    likes INTEGER,
+    dislikes INTEGER,
+    last_reported_at TIMESTAMP,
+    as_of TIMESTAMP
+) RETURNS SMALLINT LANGUAGE sql IMMUTABLE AS $$
+    SELECT LEAST(100, GREATEST(0, round(100
+        * (0.35 * (1 - exp(-GREATEST(distinct_reporters, 0) / 3.0))
+           + 0.30 * COALESCE(scammer_reports::numeric / NULLIF(report_count, 0), 0)
+           + 0.20 * (1 - exp(-GREATEST(evidence_count, 0) / 5.0))
+           + 0.15 * (1 - exp(-GREATEST(report_count, 0) / 10.0)))
+        * (0.5 + (COALESCE(likes, 0) + 1.0) / (COALESCE(likes, 0) + COALESCE(dislikes, 0) + 2.0))
+        * (0.6 + 0.4 * exp(-GREATEST(EXTRACT(EPOCH FROM as_of - COALESCE(last_reported_at, as_of)), 0) / (180 * 86400.0)))
+    )))::smallint
+$$;
+
+-- Every write to a report (submission, vote, import, recompute) refreshes its score
+CREATE OR REPLACE FUNCTION scam_reports_set_score() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.scam_score := scam_score(
+        NEW.report_count, NEW.distinct_reporters, NEW.evidence_count, NEW.scammer_reports,
+        NEW.likes, NEW.dislikes, NEW.last_reported_at, CURRENT_TIMESTAMP::timestamp
+    );
+    RETURN NEW;
+END
+$$;
+
+DROP TRIGGER IF EXISTS scam_reports_score ON scam_reports;
+CREATE TRIGGER scam_reports_score
+    BEFORE INSERT OR UPDATE ON scam_reports
+    FOR EACH ROW EXECUTE FUNCTION scam_reports_set_score();
+
+-- Backfill; per-report scam flags were never stored, so the current flag stands for all reports
+UPDATE scam_reports s
+SET distinct_reporters = GREATEST(COALESCE(e.reporters, 0), (s.reported_by IS NOT NULL)::int),
+    evidence_count = GREATEST(COALESCE(e.evidence, 0), (COALESCE(s.evidence_url, '') <> '')::int),
+    scammer_reports = CASE WHEN s.is_scammer THEN s.report_count ELSE 0 END,
+    last_reported_at = COALESCE(e.last_at, s.updated_at, s.created_at)
+FROM scam_reports r
+LEFT JOIN (
+    SELECT report_id, COUNT(DISTINCT uploaded_by) AS reporters, COUNT(*) AS evidence, MAX(created_at) AS last_at
+    FROM report_evidence
+    GROUP BY report_id
+) e ON e.report_id = r.id
+WHERE s.id = r.id;
+
+-- Sorting and filtering search results by score
+CREATE INDEX IF NOT EXISTS idx_scam_reports_score ON scam_reports (scam_score DESC, id DESC);
+
+-- Distinct-reporter check on every submission
+CREATE INDEX IF NOT EXISTS idx_report_evidence_report_uploader ON report_evidence (report_id, uploaded_by);
@@ -0,0 +1,64 @@
+-- Change feed of the published blocklist. A row is stamped with the id of the
+-- transaction that last changed its username or scam flag. Transaction ids are
+-- handed out in start order, not commit order, so readers only publish up to the
+-- oldest transaction still running (the snapshot xmin): everything below it has
+-- committed or rolled back, however long it took.
+CREATE OR REPLACE FUNCTION current_change_xid() RETURNS BIGINT LANGUAGE sql VOLATILE AS $$
+    SELECT pg_current_xact_id()::text::bigint
+$$;
+
+ALTER TABLE scam_reports ADD COLUMN IF NOT EXISTS change_xid BIGINT;
+UPDATE scam_reports SET change_xid = current_change_xid() WHERE change_xid IS NULL;
+ALTER TABLE scam_reports ALTER COLUMN change_xid SET NOT NULL;
+
+CREATE OR REPLACE FUNCTION scam_reports_stamp_change() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.change_xid := current_change_xid();
+    RETURN NEW;
+END
+$$;
+
+-- Votes and score recomputes leave the blocklist as it is and are not stamped
+DROP TRIGGER IF EXISTS scam_reports_change_insert ON scam_reports;
+CREATE TRIGGER scam_reports_change_insert
+    BEFORE INSERT ON scam_reports
+    FOR EACH ROW EXECUTE FUNCTION scam_reports_stamp_change();
+
+DROP TRIGGER IF EXISTS scam_reports_change_update ON scam_reports;
+CREATE TRIGGER scam_reports_change_update
+    BEFORE UPDATE ON scam_reports
+    FOR EACH ROW
+    WHEN (OLD.is_scammer IS DISTINCT FROM NEW.is_scammer OR OLD.telegram_username IS DISTINCT FROM NEW.telegram_username)
+    EXECUTE FUNCTION scam_reports_stamp_change();
+
+-- Tombstones: usernames that left scam_reports by a delete or a rename, so
+-- deltas can remove them from clients. Deletes and renames are rare; the rows are
+-- kept, as a client on any older version may still need them.
+CREATE TABLE IF NOT EXISTS scam_report_removals (
+    username_normalized VARCHAR(255) NOT NULL,
+    change_xid BIGINT NOT NULL DEFAULT current_change_xid(),
+    removed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE OR REPLACE FUNCTION scam_reports_record_removal() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO scam_report_removals (username_normalized) VALUES (OLD.username_normalized);
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS scam_reports_removal_delete ON scam_reports;
+CREATE TRIGGER scam_reports_removal_delete
+    AFTER DELETE ON scam_reports
+    FOR EACH ROW EXECUTE FUNCTION scam_reports_record_removal();
+
+DROP TRIGGER IF EXISTS scam_reports_removal_rename ON scam_reports;
+CREATE TRIGGER scam_reports_removal_rename
+    AFTER UPDATE ON scam_reports
+    FOR EACH ROW
+    WHEN (OLD.username_normalized IS DISTINCT FROM NEW.username_normalized)
+    EXECUTE FUNCTION scam_reports_record_removal();
+
+-- Blocklist versions (MAX(change_xid)) and deltas (change_xid ranges)
+CREATE INDEX IF NOT EXISTS idx_scam_reports_change_xid ON scam_reports (change_xid);
+CREATE INDEX IF NOT EXISTS idx_scam_report_removals_change_xid ON scam_report_removals (change_xid);
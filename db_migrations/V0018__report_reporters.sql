@@ -0,0 +1,32 @@
+-- One row per (reported username, reporter). The primary key makes concurrent
+-- submissions by the same reporter count once towards distinct_reporters.
+-- ON UPDATE CASCADE follows edits of telegram_username into the generated key.
+CREATE TABLE IF NOT EXISTS report_reporters (
+    username_normalized VARCHAR(255) NOT NULL REFERENCES scam_reports(username_normalized)
+        ON UPDATE CASCADE ON DELETE CASCADE,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (username_normalized, user_id)
+);
+
+INSERT INTO report_reporters (username_normalized, user_id)
+SELECT s.username_normalized, s.reported_by FROM scam_reports s WHERE s.reported_by IS NOT NULL
+UNION
+SELECT s.username_normalized, e.uploaded_by
+FROM report_evidence e
+JOIN scam_reports s ON s.id = e.report_id
+WHERE e.uploaded_by IS NOT NULL
+ON CONFLICT DO NOTHING;
+
+UPDATE scam_reports s
+SET distinct_reporters = c.reporters
+FROM (
+    SELECT r.id, COUNT(rr.user_id)::int AS reporters
+    FROM scam_reports r
+    LEFT JOIN report_reporters rr ON rr.username_normalized = r.username_normalized
+    GROUP BY r.id
+) c
+WHERE s.id = c.id AND s.distinct_reporters <> c.reporters;
+
+-- Replaced by the primary key above
+DROP INDEX IF EXISTS idx_report_evidence_report_uploader;
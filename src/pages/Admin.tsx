@@ -33,6 +33,10 @@ const Admin = () => {
   const [loading, setLoading] = useState(true);
 
   const currentUserId = localStorage.getItem('user_id');
+  const sessionToken: string | undefined = JSON.parse(localStorage.getItem('scamkadr_user') || '{}').token;
+  const authHeaders: Record<string, string> = sessionToken
+    ? { Authorization: `Bearer ${sessionToken}` }
+    : { 'X-User-Id': currentUserId || '' };
 
   useEffect(() => {
     if (currentUserId !== '1001') {
@@ -47,7 +51,7 @@ const Admin = () => {
       const response = await fetch(funcUrls.search, {
         method: 'GET',
         headers: {
-          'X-User-Id': currentUserId || ''
+          ...authHeaders
         }
       });
       
@@ -69,7 +73,7 @@ const Admin = () => {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
-          'X-User-Id': currentUserId || ''
+          ...authHeaders
         },
         body: JSON.stringify({
           action: 'toggle_creator',
@@ -91,7 +95,7 @@ const Admin = () => {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
-          'X-User-Id': currentUserId || ''
+          ...authHeaders
         },
         body: JSON.stringify({
           action: 'delete_report',
@@ -14,6 +14,7 @@ interface User {
   email: string;
   is_creator: boolean;
   avatar_url?: string;
+  token?: string;
 }
 
 interface Friend {
@@ -54,10 +55,14 @@ interface SearchResult {
   evidence_url?: string;
   likes: number;
   dislikes: number;
+  score?: number;
 }
 
 const Index = () => {
   const [currentUser, setCurrentUser] = useState<User | null>(null);
+  const authHeaders: Record<string, string> = currentUser?.token
+    ? { Authorization: `Bearer ${currentUser.token}` }
+    : {};
   const [searchUsername, setSearchUsername] = useState('');
   const [searchResults, setSearchResults] = useState<SearchResult[]>([]);
   const [isSearching, setIsSearching] = useState(false);
@@ -161,7 +166,8 @@ const Index = () => {
     if (!currentUser) return;
     try {
       const response = await fetch(
-        `https://functions.poehali.dev/2f80e002-f06f-423f-a633-a2c26f5c4cf8?user_id=${currentUser.id}`
+        `https://functions.poehali.dev/2f80e002-f06f-423f-a633-a2c26f5c4cf8?user_id=${currentUser.id}`,
+        { headers: authHeaders }
       );
       const data = await response.json();
       setFriends(data.friends || []);
@@ -183,7 +189,7 @@ const Index = () => {
     try {
       const response = await fetch('https://functions.poehali.dev/2f80e002-f06f-423f-a633-a2c26f5c4cf8', {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: { 'Content-Type': 'application/json', ...authHeaders },
         body: JSON.stringify({ user_id: currentUser.id, friend_user_id: friendUserId })
       });
 
@@ -224,7 +230,7 @@ const Index = () => {
       try {
         const response = await fetch('https://functions.poehali.dev/1de1e77d-129c-4a35-83e8-5e53edd71c52', {
           method: 'PUT',
-          headers: { 'Content-Type': 'application/json' },
+          headers: { 'Content-Type': 'application/json', ...authHeaders },
           body: JSON.stringify({ user_id: currentUser.id, avatar_url: `data:image/jpeg;base64,${base64}` })
         });
 
@@ -261,7 +267,7 @@ const Index = () => {
     try {
       const response = await fetch('https://functions.poehali.dev/0769ac85-d5d6-4db8-bb26-69a446ef51d9', {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: { 'Content-Type': 'application/json', ...authHeaders },
         body: JSON.stringify({
           telegram_username: reportUsername,
           is_scammer: true,
@@ -294,7 +300,7 @@ const Index = () => {
     try {
       const response = await fetch('https://functions.poehali.dev/2f80e002-f06f-423f-a633-a2c26f5c4cf8', {
         method: 'PUT',
-        headers: { 'Content-Type': 'application/json' },
+        headers: { 'Content-Type': 'application/json', ...authHeaders },
         body: JSON.stringify({ friendship_id: friendshipId, action })
       });
 
@@ -316,7 +322,7 @@ const Index = () => {
     try {
       const response = await fetch('https://functions.poehali.dev/0769ac85-d5d6-4db8-bb26-69a446ef51d9', {
         method: 'PUT',
-        headers: { 'Content-Type': 'application/json' },
+        headers: { 'Content-Type': 'application/json', ...authHeaders },
         body: JSON.stringify({
           report_id: reportId,
           user_id: currentUser.id,
@@ -343,7 +349,8 @@ const Index = () => {
     if (!currentUser) return;
     try {
       const response = await fetch(
-        `https://functions.poehali.dev/1643f5ec-0f6e-4d2a-8b6e-0e65754bc836?action=chats&user_id=${currentUser.id}`
+        `https://functions.poehali.dev/1643f5ec-0f6e-4d2a-8b6e-0e65754bc836?action=chats&user_id=${currentUser.id}`,
+        { headers: authHeaders }
       );
       const data = await response.json();
       setChats(data.chats || []);
@@ -353,9 +360,11 @@ const Index = () => {
   };
 
   const loadMessages = async (chatId: number) => {
+    if (!currentUser) return;
     try {
       const response = await fetch(
-        `https://functions.poehali.dev/1643f5ec-0f6e-4d2a-8b6e-0e65754bc836?action=messages&chat_id=${chatId}`
+        `https://functions.poehali.dev/1643f5ec-0f6e-4d2a-8b6e-0e65754bc836?action=messages&chat_id=${chatId}&user_id=${currentUser.id}`,
+        { headers: authHeaders }
       );
       const data = await response.json();
       setMessages(data.messages || []);
@@ -369,7 +378,7 @@ const Index = () => {
     try {
       const response = await fetch('https://functions.poehali.dev/1643f5ec-0f6e-4d2a-8b6e-0e65754bc836', {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: { 'Content-Type': 'application/json', ...authHeaders },
         body: JSON.stringify({ action: 'create_chat', user_id: currentUser.id, friend_id: friendId })
       });
       const data = await response.json();
@@ -393,7 +402,7 @@ const Index = () => {
     try {
       const response = await fetch('https://functions.poehali.dev/1643f5ec-0f6e-4d2a-8b6e-0e65754bc836', {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: { 'Content-Type': 'application/json', ...authHeaders },
         body: JSON.stringify({
           action: 'send_message',
           chat_id: activeChat,
@@ -667,6 +676,12 @@ const Index = () => {
                               <Icon name="Flag" size={16} />
                               <span>Количество отчетов: {result.report_count}</span>
                             </div>
+                            {result.score !== undefined && (
+                              <div className="flex items-center gap-2 text-sm text-muted-foreground">
+                                <Icon name="Gauge" size={16} />
+                                <span>Рейтинг риска: {result.score}/100</span>
+                              </div>
+                            )}
                             {result.evidence_url && (
                               <div className="flex items-center gap-2 text-sm">
                                 <Icon name="Link" size={16} className="text-primary" />